@@ -8,6 +8,8 @@ from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_login import LoginManager
 
+from spooling import SpooledUploadRequest
+
 
 class Base(DeclarativeBase):
     pass
@@ -18,6 +20,7 @@ login_manager = LoginManager()
 
 # create the app
 app = Flask(__name__)
+app.request_class = SpooledUploadRequest
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
@@ -32,8 +35,68 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 }
 
 # Configure file uploads
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
+# Kept outside the static folder so every read goes through the signed /uploads route
+app.config['UPLOAD_FOLDER'] = os.environ.get("UPLOAD_FOLDER", os.path.join(app.instance_path, 'uploads'))
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['UPLOAD_WORKERS'] = int(os.environ.get("UPLOAD_WORKERS", 4))  # Threads writing one request's files
+# Uploads are spooled here while the request is parsed; keep it on the same filesystem as
+# UPLOAD_FOLDER so saving is a hard link instead of a copy
+app.config['UPLOAD_TEMP_FOLDER'] = os.environ.get("UPLOAD_TEMP_FOLDER", os.path.join(app.instance_path, 'upload_tmp'))
+
+# Storage backend for uploaded files: "local" (UPLOAD_FOLDER) or "s3" (any S3-compatible service)
+app.config['STORAGE_BACKEND'] = os.environ.get("STORAGE_BACKEND", "local")
+app.config['S3_BUCKET'] = os.environ.get("S3_BUCKET")
+app.config['S3_PREFIX'] = os.environ.get("S3_PREFIX", "")
+app.config['S3_ENDPOINT_URL'] = os.environ.get("S3_ENDPOINT_URL")  # e.g. a MinIO URL
+app.config['S3_REGION'] = os.environ.get("S3_REGION")
+app.config['S3_ACCESS_KEY_ID'] = os.environ.get("S3_ACCESS_KEY_ID")
+app.config['S3_SECRET_ACCESS_KEY'] = os.environ.get("S3_SECRET_ACCESS_KEY")
+app.config['S3_PRESIGNED_URL_TTL'] = int(os.environ.get("S3_PRESIGNED_URL_TTL", 300))
+
+# Resumable chunked uploads: partial files are kept here until the last chunk arrives
+app.config['CHUNKED_UPLOAD_FOLDER'] = os.path.join(app.instance_path, 'chunked_uploads')
+app.config['CHUNKED_UPLOAD_CHUNK_SIZE'] = 1024 * 1024  # 1MB chunks suit satellite and mobile links
+app.config['MAX_CHUNKED_UPLOAD_SIZE'] = 100 * 1024 * 1024  # 100MB max assembled file size
+
+# How /uploads hands bytes to the client: "" streams from the worker, "x-sendfile" (Apache,
+# lighttpd) or "x-accel-redirect" (nginx, internal location at UPLOAD_ACCEL_REDIRECT_PREFIX
+# aliased to UPLOAD_FOLDER) leave the transfer to the front proxy
+app.config['UPLOAD_OFFLOAD'] = os.environ.get("UPLOAD_OFFLOAD", "").lower()
+app.config['UPLOAD_ACCEL_REDIRECT_PREFIX'] = os.environ.get("UPLOAD_ACCEL_REDIRECT_PREFIX", "/protected-uploads/")
+app.config['USE_X_SENDFILE'] = app.config['UPLOAD_OFFLOAD'] == 'x-sendfile'
+app.config['IMMUTABLE_UPLOAD_MAX_AGE'] = 365 * 24 * 3600  # Content-addressed files never change
+
+# Links to uploaded files are HMAC-signed and expire; URLs are stable within a bucket so
+# caches can reuse them
+app.config['SIGNED_UPLOAD_URLS'] = os.environ.get("SIGNED_UPLOAD_URLS", "true").lower() in ("1", "true", "yes")
+app.config['UPLOAD_URL_TTL'] = int(os.environ.get("UPLOAD_URL_TTL", 3600))
+app.config['UPLOAD_URL_BUCKET'] = int(os.environ.get("UPLOAD_URL_BUCKET", 900))
+
+# Uploaded photos and scans are rotated upright, stripped of EXIF, capped in size and
+# re-encoded (requires Pillow); set KEEP_ORIGINAL_IMAGES to also store the untouched file
+app.config['NORMALIZE_IMAGES'] = os.environ.get("NORMALIZE_IMAGES", "true").lower() in ("1", "true", "yes")
+app.config['KEEP_ORIGINAL_IMAGES'] = os.environ.get("KEEP_ORIGINAL_IMAGES", "false").lower() in ("1", "true", "yes")
+app.config['IMAGE_MAX_DIMENSION'] = int(os.environ.get("IMAGE_MAX_DIMENSION", 2400))
+app.config['IMAGE_JPEG_QUALITY'] = int(os.environ.get("IMAGE_JPEG_QUALITY", 85))
+
+# Document previews: bounding box in pixels and the time allowed to render a PDF page
+app.config['THUMBNAIL_SIZE'] = (320, 320)
+app.config['PREVIEW_TIMEOUT'] = 30
+app.config['PREVIEW_WORKERS'] = int(os.environ.get("PREVIEW_WORKERS", 2))  # Separate from export jobs
+
+# Background export jobs build their CSVs here before handing them to upload storage
+app.config['EXPORT_FOLDER'] = os.path.join(app.instance_path, 'exports')
+
+# Seconds without progress after which a pending or running export job is presumed lost to a
+# restart and queued again
+app.config['EXPORT_JOB_STALE_AFTER'] = int(os.environ.get("EXPORT_JOB_STALE_AFTER", 600))
+
+# Incremental exports hand out a watermark this many seconds before the export started, so
+# rows flushed before it but committed after it still land in the next export
+app.config['EXPORT_WATERMARK_OVERLAP'] = int(os.environ.get("EXPORT_WATERMARK_OVERLAP", 300))
+
+# Seconds the admin dashboard may reuse cached status counts
+app.config['DASHBOARD_STATS_TTL'] = int(os.environ.get("DASHBOARD_STATS_TTL", 60))
 
 # Initialize extensions
 db.init_app(app)
@@ -45,9 +108,24 @@ with app.app_context():
     # Import models and routes
     import models
     import routes
+    import commands
+    
+    # Create or upgrade tables
+    from migrations import run_migrations
+    run_migrations()
+    
+    # Uploads used to be kept under static/, where Flask served them to anyone
+    if app.config['STORAGE_BACKEND'] == 'local':
+        from storage import move_legacy_uploads
+        moved = move_legacy_uploads(os.path.join(app.static_folder, 'uploads'), app.config['UPLOAD_FOLDER'])
+        if moved:
+            app.logger.info(f"Moved {moved} uploaded files out of static/uploads")
     
-    # Create tables
-    db.create_all()
+    # Pillow comes with the optional "images" extra; without it uploads are stored as received
+    from imaging import Image
+    if app.config['NORMALIZE_IMAGES'] and Image is None:
+        app.logger.warning("NORMALIZE_IMAGES is on but Pillow is not installed, so images are stored as uploaded; "
+                           "install the 'images' extra or set NORMALIZE_IMAGES=false")
     
     # Create default admin if not exists
     from werkzeug.security import generate_password_hash
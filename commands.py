@@ -0,0 +1,447 @@
+import time
+
+import click
+
+from app import app, db
+from models import CrewMember, CrewDocument, StaffMember, StoredBlob, DOCUMENT_TYPE_BITS, LEGACY_FILE_COLUMNS, completion_percentage_for_mask
+from migrations import run_migrations
+
+
+@app.cli.command('db-upgrade')
+def db_upgrade():
+    """Apply pending schema migrations"""
+    run_migrations()
+    click.echo('Database schema is up to date')
+
+
+def _hot_path_queries():
+    """Representative queries issued by routes.py, paired with the index each should use"""
+    from datetime import datetime
+    from models import StatusEvent
+    from routes import active_crew_filter
+    from search import matching_ids
+
+    since = datetime(2024, 1, 1)
+    queries = [
+        ('crew_list keyset page',
+         CrewMember.query.order_by(CrewMember.created_at.desc(), CrewMember.id.desc()).limit(51),
+         'ix_crew_members_created_at'),
+        ('staff_list keyset page',
+         StaffMember.query.order_by(StaffMember.created_at.desc(), StaffMember.id.desc()).limit(51),
+         'ix_staff_members_created_at'),
+        ('crew_list status filter',
+         CrewMember.query.filter(CrewMember.status == 1).order_by(CrewMember.created_at.desc()),
+         'ix_crew_members_status_created_at'),
+        ('staff_list status filter',
+         StaffMember.query.filter(StaffMember.status == 1).order_by(StaffMember.created_at.desc()),
+         'ix_staff_members_status_created_at'),
+        ('crew active pipeline',
+         CrewMember.query.filter(active_crew_filter())
+         .order_by(CrewMember.created_at.desc(), CrewMember.id.desc()).limit(51),
+         'ix_crew_members_active_created_at'),
+        ('crew complete filter',
+         CrewMember.query.filter(CrewMember.completion_percentage == 100)
+         .order_by(CrewMember.created_at.desc(), CrewMember.id.desc()).limit(51),
+         'ix_crew_members_completion_created_at'),
+        # Most crew are incomplete, so walking created_at and filtering fills a page soonest
+        ('crew incomplete filter',
+         CrewMember.query.filter(CrewMember.completion_percentage < 100)
+         .order_by(CrewMember.created_at.desc(), CrewMember.id.desc()).limit(51),
+         'ix_crew_members_created_at'),
+        ('crew incremental export',
+         CrewMember.query.filter(CrewMember.updated_at >= since).order_by(CrewMember.updated_at, CrewMember.id),
+         'ix_crew_members_updated_at'),
+        ('staff incremental export',
+         StaffMember.query.filter(StaffMember.updated_at >= since).order_by(StaffMember.updated_at, StaffMember.id),
+         'ix_staff_members_updated_at'),
+        ('documents by type',
+         CrewDocument.query.filter_by(crew_id=1, document_type='passport').order_by(CrewDocument.upload_date.desc()),
+         'ix_crew_documents_crew_type_upload_date'),
+        ('documents by category',
+         CrewDocument.query.filter_by(crew_id=1, document_category='identity').order_by(CrewDocument.upload_date.desc()),
+         'ix_crew_documents_crew_category_upload_date'),
+        ('status timeline',
+         StatusEvent.query.filter_by(entity_type='crew', entity_id=1).order_by(StatusEvent.id),
+         'ix_status_events_entity_id'),
+        ('status pipeline report',
+         StatusEvent.query.filter(StatusEvent.entity_type == 'crew', StatusEvent.to_status == 3,
+                                  StatusEvent.created_at >= since),
+         'ix_status_events_to_status_created_at'),
+    ]
+
+    # Substring (ilike) matching has a leading wildcard and cannot use an index, so only the
+    # full-text path is checked; without FTS5 there is nothing to check
+    search_ids = matching_ids('crew', 'john')
+    if search_ids is not None:
+        search_index = 'ix_crew_members_search_vector' if db.engine.dialect.name == 'postgresql' else 'search_index'
+        queries.append(('crew_list search',
+                        CrewMember.query.filter(CrewMember.id.in_(db.select(search_ids.c.id)))
+                        .order_by(CrewMember.created_at.desc(), CrewMember.id.desc()).limit(51),
+                        search_index))
+    return queries
+
+
+def _is_full_scan(plan):
+    """True when a plan reads a whole table instead of going through an index"""
+    if 'Seq Scan' in plan:
+        return True
+    # SQLite reports "SCAN crew_members" for a table scan, "SCAN ... USING INDEX" otherwise, and
+    # "SCAN search_index VIRTUAL TABLE INDEX" for an FTS5 MATCH lookup
+    return any(line.strip().startswith('SCAN') and 'USING' not in line and 'VIRTUAL TABLE INDEX' not in line
+               for line in plan.splitlines())
+
+
+@app.cli.command('explain-queries')
+def explain_queries():
+    """Check with EXPLAIN that each hot query path is served by its index; exits 1 on a full scan
+
+    Plans depend on ANALYZE statistics, so run this against a database holding representative rows.
+    """
+    dialect = db.engine.dialect
+    failures = 0
+
+    with db.engine.begin() as connection:
+        if dialect.name == 'postgresql':
+            # Tiny tables make the planner prefer sequential scans regardless of indexes
+            connection.execute(db.text('SET LOCAL enable_seqscan = off'))
+            prefix = 'EXPLAIN '
+        else:
+            # Without sqlite_stat1 the planner cannot tell the partial index is the selective one
+            connection.execute(db.text('ANALYZE'))
+            prefix = 'EXPLAIN QUERY PLAN '
+
+        for label, query, index_name in _hot_path_queries():
+            # Explained with the same placeholders the app sends: a bound value can stop SQLite
+            # from matching a partial index that an inlined literal would match
+            compiled = query.statement.compile(dialect=dialect, compile_kwargs={'render_postcompile': True})
+            params = tuple(compiled.params[name] for name in compiled.positiontup) if compiled.positional else compiled.params
+            plan = '\n'.join(str(row[-1]) for row in connection.exec_driver_sql(prefix + str(compiled), params))
+            uses_index = index_name in plan and not _is_full_scan(plan)
+            failures += not uses_index
+            click.echo(f"[{'ok' if uses_index else 'FAIL'}] {label}: {index_name}")
+            if not uses_index:
+                click.echo(plan)
+
+    if failures:
+        raise SystemExit(1)
+
+
+@app.cli.command('backfill-document-completion')
+@click.option('--batch-size', default=500, show_default=True, help='Crew members updated per transaction.')
+def backfill_document_completion(batch_size):
+    """Populate stored document completion columns for existing crew members"""
+    last_id = 0
+    updated = 0
+
+    while True:
+        crew_ids = [row.id for row in db.session.query(CrewMember.id)
+                    .filter(CrewMember.id > last_id)
+                    .order_by(CrewMember.id)
+                    .limit(batch_size)]
+        if not crew_ids:
+            break
+
+        # One grouped query per batch instead of one per crew member and type
+        masks = dict.fromkeys(crew_ids, 0)
+        uploaded_types = db.session.query(CrewDocument.crew_id, CrewDocument.document_type).filter(
+            CrewDocument.crew_id.in_(crew_ids)
+        ).group_by(CrewDocument.crew_id, CrewDocument.document_type)
+        for crew_id, document_type in uploaded_types:
+            masks[crew_id] |= DOCUMENT_TYPE_BITS.get(document_type, 0)
+
+        db.session.execute(
+            CrewMember.__table__.update().where(
+                CrewMember.__table__.c.id == db.bindparam('crew_id')
+            ).values(
+                document_mask=db.bindparam('mask'),
+                completion_percentage=db.bindparam('percentage')
+            ),
+            [{'crew_id': crew_id, 'mask': mask, 'percentage': completion_percentage_for_mask(mask)}
+             for crew_id, mask in masks.items()]
+        )
+        db.session.commit()
+
+        updated += len(crew_ids)
+        last_id = crew_ids[-1]
+        click.echo(f'Updated {updated} crew members')
+
+    click.echo(f'Document completion backfill finished: {updated} crew members')
+
+
+@app.cli.command('backfill-document-blobs')
+@click.option('--batch-size', default=200, show_default=True, help='Documents processed per transaction.')
+def backfill_document_blobs(batch_size):
+    """Move documents saved before content addressing into shared SHA-256 blobs"""
+    from werkzeug.datastructures import FileStorage
+    from storage import get_storage
+    from utils import store_document_blob
+
+    storage = get_storage()
+    last_id = 0
+    moved = missing = 0
+
+    # Only rows without a digest are picked up, so an interrupted run resumes where it stopped
+    while True:
+        documents = CrewDocument.query.filter(
+            CrewDocument.sha256.is_(None), CrewDocument.id > last_id
+        ).order_by(CrewDocument.id).limit(batch_size).all()
+        if not documents:
+            break
+
+        old_keys = []
+        for document in documents:
+            old_key = document.filename
+            if not storage.exists(old_key):
+                missing += 1
+                continue
+            with storage.open(old_key) as handle:
+                document.filename, document.file_size, document.sha256 = store_document_blob(
+                    FileStorage(stream=handle, filename=old_key)
+                )
+            db.session.flush()
+            old_keys.append(old_key)
+            moved += 1
+
+        db.session.commit()
+        # Originals are removed only once the rows pointing at blobs are committed
+        for old_key in old_keys:
+            storage.delete(old_key)
+
+        last_id = documents[-1].id
+        click.echo(f'Moved {moved} documents into blob storage ({missing} missing from storage)')
+
+    click.echo(f'Document blob backfill finished: {moved} moved, {missing} missing')
+
+
+def _move_to_shard(storage, key):
+    """Move a flat 'folder/filename' key into its shard; returns the new key, or None if the file is gone"""
+    from imaging import original_filename
+    from utils import sharded_key
+
+    folder, _, filename = key.partition('/')
+    new_key = sharded_key(folder, filename)
+    if storage.exists(key):
+        storage.move(key, new_key)
+        if storage.exists(original_filename(key)):
+            storage.move(original_filename(key), original_filename(new_key))
+    elif not storage.exists(new_key):
+        return None
+    # A file already at new_key was moved by an interrupted run whose rows never committed
+    return new_key
+
+
+@app.cli.command('shard-uploads')
+@click.option('--batch-size', default=200, show_default=True, help='Rows processed per transaction.')
+def shard_uploads(batch_size):
+    """Move files from the flat upload folders into the two-level hex sharded layout"""
+    from storage import get_storage
+
+    storage = get_storage()
+    targets = [
+        (CrewDocument, ['filename']),
+        (CrewMember, LEGACY_FILE_COLUMNS),
+        (StaffMember, ['resume_file', 'photo_file']),
+    ]
+
+    for model, column_names in targets:
+        table = model.__table__
+        columns = [table.c[name] for name in column_names]
+        # Flat keys have a single slash ('crew/crew_ab12cd34_passport.pdf'); sharded ones have three
+        is_flat = db.or_(*(db.and_(column.isnot(None), column.like('%/%'), ~column.like('%/%/%')) for column in columns))
+        last_id = 0
+        moved = missing = 0
+
+        while True:
+            rows = db.session.execute(
+                db.select(table.c.id, *columns).where(is_flat, table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            updates = []
+            for row in rows:
+                values = {'row_id': row.id}
+                for name in column_names:
+                    key = getattr(row, name)
+                    if key and key.count('/') == 1:
+                        new_key = _move_to_shard(storage, key)
+                        if new_key is None:
+                            missing += 1
+                        else:
+                            key = new_key
+                            moved += 1
+                    values[f'new_{name}'] = key
+                updates.append(values)
+
+            statement = table.update().where(table.c.id == db.bindparam('row_id')).values(
+                {name: db.bindparam(f'new_{name}') for name in column_names}
+            )
+            if 'updated_at' in table.c:
+                # Moving a file is not an edit; keep incremental exports quiet
+                statement = statement.values(updated_at=table.c.updated_at)
+            db.session.execute(statement, updates)
+            db.session.commit()
+
+            last_id = rows[-1].id
+            click.echo(f'{table.name}: moved {moved} files ({missing} missing from storage)')
+
+        click.echo(f'{table.name}: sharding finished, {moved} moved, {missing} missing')
+
+
+@app.cli.command('generate-document-previews')
+@click.option('--batch-size', default=200, show_default=True, help='Documents loaded per batch.')
+def generate_document_previews(batch_size):
+    """Render thumbnails for documents uploaded before previews existed"""
+    from previews import generate_document_preview
+
+    last_id = 0
+    rendered = 0
+
+    while True:
+        document_ids = [document_id for document_id, in db.session.query(CrewDocument.id).filter(
+            CrewDocument.thumbnail_filename.is_(None), CrewDocument.id > last_id
+        ).order_by(CrewDocument.id).limit(batch_size)]
+        if not document_ids:
+            break
+
+        for document_id in document_ids:
+            if generate_document_preview(document_id):
+                rendered += 1
+
+        last_id = document_ids[-1]
+        click.echo(f'Rendered {rendered} previews (up to document {last_id})')
+
+    click.echo(f'Document preview generation finished: {rendered} rendered')
+
+
+@app.cli.command('gc-uploads')
+@click.option('--delete', is_flag=True, help='Remove orphaned files instead of only listing them.')
+@click.option('--min-age-hours', default=24, show_default=True, help='Skip files modified more recently than this.')
+@click.option('--batch-size', default=500, show_default=True, help='Files checked per database lookup.')
+@click.option('--pause', default=0.2, show_default=True, help='Seconds to sleep between batches.')
+@click.option('--max-deletes-per-second', default=50, show_default=True, help='Upper bound on the delete rate.')
+@click.option('--chunked-max-age-hours', default=48, show_default=True, help='Expire resumable uploads idle for longer than this.')
+def gc_uploads(delete, min_age_hours, batch_size, pause, max_deletes_per_second, chunked_max_age_hours):
+    """Report or remove orphaned uploaded files and abandoned resumable uploads"""
+    from upload_gc import iter_orphan_uploads, reclaim_orphan_upload
+    from uploads import expire_stale_uploads, iter_stale_uploads
+
+    chunked_max_age = chunked_max_age_hours * 3600
+    if delete:
+        expired, expired_bytes = expire_stale_uploads(chunked_max_age)
+        click.echo(f'Expired {expired} abandoned resumable uploads ({expired_bytes} bytes)')
+    else:
+        for upload_id, size in iter_stale_uploads(chunked_max_age):
+            click.echo(f'chunked:{upload_id}\t{size}')
+
+    found = found_bytes = reclaimed = reclaimed_bytes = 0
+    delete_interval = 1.0 / max_deletes_per_second if max_deletes_per_second else 0
+
+    for key, size in iter_orphan_uploads(min_age=min_age_hours * 3600, batch_size=batch_size, pause=pause):
+        found += 1
+        found_bytes += size
+        if not delete:
+            click.echo(f'{key}\t{size}')
+            continue
+
+        started = time.monotonic()
+        if reclaim_orphan_upload(key):
+            reclaimed += 1
+            reclaimed_bytes += size
+        # Spread deletes out rather than hammering the disk or bucket
+        time.sleep(max(0.0, delete_interval - (time.monotonic() - started)))
+
+    if delete:
+        click.echo(f'Upload GC finished: removed {reclaimed} of {found} orphaned files ({reclaimed_bytes} bytes)')
+    else:
+        click.echo(f'Upload GC finished: {found} orphaned files ({found_bytes} bytes); rerun with --delete to remove them')
+
+
+@app.cli.command('backfill-legacy-documents')
+@click.option('--batch-size', default=200, show_default=True, help='Crew members processed per transaction.')
+def backfill_legacy_documents(batch_size):
+    """Turn registration files stored in crew *_file columns into CrewDocument rows"""
+    import mimetypes
+    import os
+    from models import document_category_for_type
+    from storage import get_storage
+
+    storage = get_storage()
+    crew_table = CrewMember.__table__
+    legacy_columns = [crew_table.c[column] for column in LEGACY_FILE_COLUMNS]
+    last_id = 0
+    converted = missing = 0
+
+    # Converted columns are cleared in the same transaction, so a rerun only sees what is left
+    while True:
+        rows = db.session.execute(
+            db.select(crew_table.c.id, crew_table.c.created_at, crew_table.c.document_mask, *legacy_columns)
+            .where(db.or_(*(column.isnot(None) for column in legacy_columns)), crew_table.c.id > last_id)
+            .order_by(crew_table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        documents = []
+        crew_updates = []
+        for row in rows:
+            values = {'crew_id': row.id, 'mask': row.document_mask or 0}
+            for column in LEGACY_FILE_COLUMNS:
+                key = getattr(row, column)
+                values[f'new_{column}'] = key
+                if not key:
+                    continue
+                if not storage.exists(key):
+                    missing += 1
+                    continue
+
+                document_type = column[:-len('_file')]
+                documents.append({
+                    'crew_id': row.id,
+                    'document_type': document_type,
+                    'document_category': document_category_for_type(document_type),
+                    'filename': key,
+                    'original_filename': os.path.basename(key),
+                    'file_size': storage.size(key),
+                    'mime_type': mimetypes.guess_type(key)[0] or 'application/octet-stream',
+                    'upload_date': row.created_at,
+                })
+                values[f'new_{column}'] = None
+                values['mask'] |= DOCUMENT_TYPE_BITS.get(document_type, 0)
+                converted += 1
+            values['percentage'] = completion_percentage_for_mask(values['mask'])
+            crew_updates.append(values)
+
+        if documents:
+            db.session.execute(db.insert(CrewDocument), documents)
+        db.session.execute(
+            crew_table.update().where(crew_table.c.id == db.bindparam('crew_id')).values(
+                document_mask=db.bindparam('mask'),
+                completion_percentage=db.bindparam('percentage'),
+                # Moving a file between tables is not an edit; keep incremental exports quiet
+                updated_at=crew_table.c.updated_at,
+                **{column: db.bindparam(f'new_{column}') for column in LEGACY_FILE_COLUMNS}
+            ),
+            crew_updates
+        )
+        db.session.commit()
+
+        last_id = rows[-1].id
+        click.echo(f'Converted {converted} registration files ({missing} missing from storage)')
+
+    click.echo(f'Legacy document backfill finished: {converted} converted, {missing} missing; '
+               f'run backfill-document-blobs to move them into content-addressed storage')
+
+
+@app.cli.command('revoke-profile-token')
+@click.argument('crew_id', type=int)
+def revoke_profile_token(crew_id):
+    """Invalidate a crew member's profile links and issue a new one"""
+    crew_member = db.session.get(CrewMember, crew_id)
+    if crew_member is None:
+        raise click.ClickException(f'No crew member with id {crew_id}')
+
+    crew_member.revoke_profile_token()
+    db.session.commit()
+    click.echo(f'Revoked profile links for crew member {crew_id}; now at token version {crew_member.token_version}')
@@ -0,0 +1,189 @@
+"""Streaming and background CSV exports for crew and staff data"""
+import csv
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+from io import StringIO
+
+from flask import current_app
+
+
+# Column header and value getter for each exported field
+CREW_EXPORT_COLUMNS = [
+    ('Name', lambda crew: crew.name),
+    ('Rank', lambda crew: crew.rank),
+    ('Passport', lambda crew: crew.passport),
+    ('Nationality', lambda crew: crew.nationality),
+    ('Email', lambda crew: crew.email),
+    ('Mobile', lambda crew: crew.mobile_number),
+    ('Experience (Years)', lambda crew: crew.years_experience),
+    ('Availability Date', lambda crew: crew.availability_date),
+    ('Status', lambda crew: crew.get_status_name()),
+    ('Created At', lambda crew: crew.created_at.strftime('%Y-%m-%d')),
+    ('Updated At', lambda crew: crew.updated_at.strftime('%Y-%m-%d %H:%M:%S') if crew.updated_at else ''),
+]
+
+STAFF_EXPORT_COLUMNS = [
+    ('Full Name', lambda staff: staff.full_name),
+    ('Position', lambda staff: staff.position_applying),
+    ('Department', lambda staff: staff.department),
+    ('Email/WhatsApp', lambda staff: staff.email_or_whatsapp),
+    ('Mobile', lambda staff: staff.mobile_number),
+    ('Location', lambda staff: staff.location),
+    ('Experience (Years)', lambda staff: staff.years_experience),
+    ('Availability Date', lambda staff: staff.availability_date),
+    ('Status', lambda staff: staff.get_status_name()),
+    ('Created At', lambda staff: staff.created_at.strftime('%Y-%m-%d')),
+    ('Updated At', lambda staff: staff.updated_at.strftime('%Y-%m-%d %H:%M:%S') if staff.updated_at else ''),
+]
+
+# Flush buffered CSV text once it grows past this many characters
+CHUNK_SIZE = 64 * 1024
+
+# Rows fetched and written per batch by background export jobs
+EXPORT_BATCH_SIZE = 1000
+
+# Finished background exports live in upload storage under this prefix, so any instance can
+# serve the download; /uploads refuses to serve it
+EXPORT_PREFIX = 'exports/'
+
+
+def iter_csv(query, columns, batch_size=1000):
+    """Yield CSV text in chunks, fetching rows through a server-side cursor"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in columns])
+
+    # yield_per enables stream_results, so rows arrive in batches instead of all at once
+    for record in query.yield_per(batch_size):
+        writer.writerow([getter(record) for _, getter in columns])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_gzip(chunks):
+    """Gzip-compress a stream of text chunks on the fly"""
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf-8'))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_key(job):
+    """Storage key of an export job's finished CSV"""
+    return f'{EXPORT_PREFIX}{job.entity}_export_{job.id}.csv'
+
+
+def run_export_job(job_id):
+    """Write an export job's CSV in keyset batches, recording progress after each one, then store it"""
+    from models import db, ExportJob, CrewMember, StaffMember  # Import here to avoid circular imports
+    from routes import filtered_crew_query, filtered_staff_query
+    from storage import get_storage
+
+    # Claim the job, so a job requeued after a restart is never run by two workers
+    export_jobs = ExportJob.__table__
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        export_jobs.update().where(export_jobs.c.id == job_id, export_jobs.c.status == 'pending').values(
+            status='running', started_at=now, heartbeat_at=now, rows_written=0, error=None
+        )
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return
+
+    job = db.session.get(ExportJob, job_id)
+    partial_path = None
+    try:
+        sources = {
+            'crew': (CrewMember, CREW_EXPORT_COLUMNS, filtered_crew_query),
+            'staff': (StaffMember, STAFF_EXPORT_COLUMNS, filtered_staff_query),
+        }
+        if job.entity not in sources:
+            raise ValueError(f'Unknown export entity: {job.entity}')
+        model, columns, build_query = sources[job.entity]
+        filters = json.loads(job.filters or '{}')
+
+        job.total_rows = build_query(filters).order_by(None).count()
+        db.session.commit()
+
+        # Built on local scratch space, then handed to storage in one piece
+        export_folder = current_app.config['EXPORT_FOLDER']
+        os.makedirs(export_folder, exist_ok=True)
+        partial_path = os.path.join(export_folder, f'{job.entity}_export_{job.id}.csv.part')
+
+        with open(partial_path, 'w', newline='', encoding='utf-8') as handle:
+            writer = csv.writer(handle)
+            writer.writerow([header for header, _ in columns])
+
+            # Short keyset batches rather than one long cursor, so progress commits never
+            # contend with an open read transaction
+            last_id = 0
+            while True:
+                batch = build_query(filters).filter(model.id > last_id).order_by(model.id).limit(EXPORT_BATCH_SIZE).all()
+                if not batch:
+                    break
+                writer.writerows([getter(record) for _, getter in columns] for record in batch)
+                handle.flush()
+
+                last_id = batch[-1].id
+                job.rows_written += len(batch)
+                job.heartbeat_at = datetime.utcnow()
+                db.session.commit()
+
+        file_size = os.path.getsize(partial_path)
+        key = export_key(job)
+        get_storage().save_file(key, partial_path)
+    except Exception as exc:
+        db.session.rollback()
+        if partial_path and os.path.exists(partial_path):
+            os.remove(partial_path)
+        job.status = 'failed'
+        job.error = str(exc)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        raise
+
+    job.status = 'complete'
+    job.file_path = key
+    job.file_size = file_size
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def requeue_stale_export_jobs(job_ids=None):
+    """Put pending or running jobs whose worker went quiet (a restart) back on the queue; returns their ids"""
+    from models import db, ExportJob  # Import here to avoid circular imports
+    from tasks import submit
+
+    export_jobs = ExportJob.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['EXPORT_JOB_STALE_AFTER'])
+    last_activity = db.func.coalesce(export_jobs.c.heartbeat_at, export_jobs.c.started_at, export_jobs.c.created_at)
+    stale = db.and_(export_jobs.c.status.in_(('pending', 'running')), last_activity < cutoff)
+
+    query = db.select(export_jobs.c.id).where(stale)
+    if job_ids is not None:
+        query = query.where(export_jobs.c.id.in_(job_ids))
+
+    requeued = []
+    for job_id in db.session.execute(query).scalars().all():
+        # Conditional, so when several workers start together only one requeues each job
+        if db.session.execute(
+            export_jobs.update().where(export_jobs.c.id == job_id, stale).values(
+                status='pending', heartbeat_at=datetime.utcnow()
+            )
+        ).rowcount:
+            requeued.append(job_id)
+    db.session.commit()
+
+    for job_id in requeued:
+        submit(run_export_job, job_id)
+    return requeued
@@ -0,0 +1,76 @@
+"""Normalization of uploaded photos and scans before they are stored.
+
+Phone photos arrive as multi-megabyte JPEGs with full EXIF. When NORMALIZE_IMAGES is
+on (and Pillow is installed) they are rotated upright, capped at IMAGE_MAX_DIMENSION,
+stripped of metadata and re-encoded; the untouched upload is kept under ORIGINALS_PREFIX
+only when KEEP_ORIGINAL_IMAGES is set.
+"""
+import os
+import posixpath
+import tempfile
+
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Uploads are stored as received without Pillow
+    Image = None
+
+ORIGINALS_PREFIX = 'originals/'
+
+NORMALIZED_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+
+def original_filename(key, digest=None, ext=''):
+    """Storage key of the untouched upload kept next to a normalized image
+
+    Content-addressed blobs are shared by every upload that normalizes to the same bytes,
+    so their originals are filed under the blob key by the original's own digest.
+    """
+    if digest is None:
+        return f"{ORIGINALS_PREFIX}{key}"
+    return f"{ORIGINALS_PREFIX}{key}/{digest}{ext.lower()}"
+
+
+def normalized_key_for_original(key):
+    """Key of the normalized file a digest-named original under ORIGINALS_PREFIX belongs to"""
+    return posixpath.dirname(key.removeprefix(ORIGINALS_PREFIX))
+
+
+def normalize_image(file):
+    """Re-encoded copy of an image upload, or None when it should be stored as received"""
+    config = current_app.config
+    if Image is None or not config['NORMALIZE_IMAGES']:
+        return None
+
+    extension = os.path.splitext(file.filename or '')[1].lower()
+    if extension not in NORMALIZED_EXTENSIONS:
+        return None
+
+    max_dimension = config['IMAGE_MAX_DIMENSION']
+    os.makedirs(config['UPLOAD_TEMP_FOLDER'], exist_ok=True)
+    output = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, dir=config['UPLOAD_TEMP_FOLDER'])
+    file.stream.seek(0)
+    try:
+        with Image.open(file.stream) as image:
+            # Let the JPEG decoder downscale while decoding instead of inflating the full frame
+            image.draft('RGB', (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_dimension, max_dimension))
+
+            # Saving without exif/pnginfo drops the metadata
+            if extension == '.png':
+                image.save(output, 'PNG', optimize=True)
+            else:
+                image.convert('RGB').save(output, 'JPEG', quality=config['IMAGE_JPEG_QUALITY'],
+                                          optimize=True, progressive=True)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as exc:
+        # Not a readable image after all; keep the bytes the user sent
+        current_app.logger.warning(f'Could not normalize {file.filename}: {exc}')
+        output.close()
+        file.stream.seek(0)
+        return None
+
+    output.seek(0)
+    return FileStorage(stream=output, filename=file.filename, content_type=file.content_type)
@@ -0,0 +1,226 @@
+"""Versioned schema migrations, applied in order and recorded in schema_migrations"""
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app import app, db
+
+
+schema_migrations = sa.Table(
+    'schema_migrations', sa.MetaData(),
+    sa.Column('version', sa.Integer, primary_key=True),
+    sa.Column('description', sa.String(255), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function under a version number"""
+    def decorator(upgrade):
+        MIGRATIONS.append((version, description, upgrade))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return upgrade
+    return decorator
+
+
+def add_column_if_missing(connection, column):
+    """Add a model column to its existing table unless it is already there"""
+    table = column.table
+    existing = {col['name'] for col in sa.inspect(connection).get_columns(table.name)}
+    if column.name in existing:
+        return
+
+    ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=connection.dialect)}'
+    if column.default is not None and column.default.is_scalar:
+        ddl += f' DEFAULT {column.default.arg!r}'
+    if not column.nullable:
+        ddl += ' NOT NULL'
+    connection.execute(sa.text(ddl))
+
+
+def create_index_if_missing(connection, index):
+    """Create a model index unless it already exists"""
+    index.create(connection, checkfirst=True)
+
+
+def create_named_index_if_missing(connection, name, table_name, columns, where=None):
+    """Create an index spelled out by the migration itself, so later model changes cannot alter it"""
+    ddl = f'CREATE INDEX IF NOT EXISTS {name} ON {table_name} ({", ".join(columns)})'
+    if where:
+        ddl += f' WHERE {where}'
+    connection.execute(sa.text(ddl))
+
+
+def create_table_if_missing(connection, table):
+    """Create a model table (and its indexes) unless it already exists"""
+    table.create(connection, checkfirst=True)
+
+
+def run_migrations(engine=None):
+    """Apply every pending migration in a single transaction"""
+    engine = engine or db.engine
+
+    with engine.begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            # Serialize concurrent workers starting up against the same database
+            connection.execute(sa.text('SELECT pg_advisory_xact_lock(84210517)'))
+
+        schema_migrations.create(connection, checkfirst=True)
+        applied = set(connection.execute(sa.select(schema_migrations.c.version)).scalars())
+
+        for version, description, upgrade in MIGRATIONS:
+            if version in applied:
+                continue
+            upgrade(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+            app.logger.info(f'Applied migration {version}: {description}')
+
+
+@migration(1, 'Baseline schema')
+def baseline_schema(connection):
+    # Creates only missing tables, so existing pre-migration databases are left untouched
+    db.metadata.create_all(bind=connection)
+
+
+@migration(2, 'Document completion columns on crew_members')
+def document_completion_columns(connection):
+    from models import CrewMember
+
+    add_column_if_missing(connection, CrewMember.__table__.c.document_mask)
+    add_column_if_missing(connection, CrewMember.__table__.c.completion_percentage)
+    create_index_if_missing(connection, next(
+        index for index in CrewMember.__table__.indexes if index.name == 'ix_crew_members_completion_percentage'
+    ))
+
+
+@migration(3, 'Indexes for admin list and document lookups')
+def hot_path_indexes(connection):
+    # Spelled out rather than read from the models: indexes added later (such as the sha256 one
+    # from migration 7) may cover columns this schema version does not have yet
+    create_named_index_if_missing(connection, 'ix_crew_members_created_at', 'crew_members', ['created_at'])
+    create_named_index_if_missing(connection, 'ix_crew_members_status_created_at', 'crew_members', ['status', 'created_at'])
+    create_named_index_if_missing(connection, 'ix_crew_members_active_created_at', 'crew_members', ['created_at'],
+                                  where='status IN (0, 1, 2)')
+    create_named_index_if_missing(connection, 'ix_staff_members_created_at', 'staff_members', ['created_at'])
+    create_named_index_if_missing(connection, 'ix_staff_members_status_created_at', 'staff_members', ['status', 'created_at'])
+    create_named_index_if_missing(connection, 'ix_crew_documents_crew_type_upload_date', 'crew_documents',
+                                  ['crew_id', 'document_type', 'upload_date'])
+    create_named_index_if_missing(connection, 'ix_crew_documents_crew_category_upload_date', 'crew_documents',
+                                  ['crew_id', 'document_category', 'upload_date'])
+
+
+@migration(4, 'Full-text search index for crew, staff and document filenames')
+def full_text_search_index(connection):
+    from search import install_search_index
+
+    install_search_index(connection)
+
+
+@migration(5, 'updated_at indexes for incremental exports')
+def updated_at_indexes(connection):
+    from models import CrewMember, StaffMember
+
+    for table in (CrewMember.__table__, StaffMember.__table__):
+        for index in table.indexes:
+            if index.name.endswith('_updated_at'):
+                create_index_if_missing(connection, index)
+
+
+@migration(6, 'Background export jobs')
+def export_jobs_table(connection):
+    from models import ExportJob
+
+    create_table_if_missing(connection, ExportJob.__table__)
+
+
+@migration(7, 'Content-addressed document blobs')
+def stored_blobs(connection):
+    from models import CrewDocument, StoredBlob
+
+    create_table_if_missing(connection, StoredBlob.__table__)
+    add_column_if_missing(connection, CrewDocument.__table__.c.sha256)
+    create_index_if_missing(connection, next(
+        index for index in CrewDocument.__table__.indexes if index.name == 'ix_crew_documents_sha256'
+    ))
+
+
+@migration(8, 'Document thumbnails')
+def document_thumbnails(connection):
+    from models import CrewDocument
+
+    add_column_if_missing(connection, CrewDocument.__table__.c.thumbnail_filename)
+
+
+@migration(9, 'Append-only status history')
+def status_events(connection):
+    from models import CrewMember, StaffMember, StatusEvent
+
+    create_table_if_missing(connection, StatusEvent.__table__)
+    for index in StatusEvent.__table__.indexes:
+        create_index_if_missing(connection, index)
+
+    # Seed the current status of existing rows so every entity has a latest event
+    events = StatusEvent.__table__
+    for entity_type, model in (('crew', CrewMember), ('staff', StaffMember)):
+        table = model.__table__
+        already_seeded = sa.select(events.c.id).where(events.c.entity_type == entity_type, events.c.entity_id == table.c.id)
+        connection.execute(events.insert().from_select(
+            ['entity_type', 'entity_id', 'to_status', 'created_at'],
+            sa.select(
+                # A NULL status reads as the model's own default (Registered for crew, Screening for staff)
+                sa.literal(entity_type), table.c.id, sa.func.coalesce(table.c.status, table.c.status.default.arg),
+                sa.func.coalesce(table.c.updated_at, table.c.created_at, sa.func.current_timestamp())
+            ).where(~already_seeded.exists())
+        ))
+
+
+@migration(10, 'Signed profile tokens')
+def crew_token_version(connection):
+    from models import CrewMember
+
+    crew_table = CrewMember.__table__
+    add_column_if_missing(connection, crew_table.c.token_version)
+
+    # Crew without a legacy random token get a signed link straight away rather than none
+    connection.execute(crew_table.update().where(
+        crew_table.c.token_version.is_(None), crew_table.c.profile_token.is_(None)
+    ).values(token_version=1, updated_at=crew_table.c.updated_at))
+
+
+@migration(11, 'Export job heartbeats')
+def export_job_heartbeats(connection):
+    from models import ExportJob
+
+    add_column_if_missing(connection, ExportJob.__table__.c.heartbeat_at)
+
+
+@migration(12, 'Non-null created_at on crew and staff')
+def created_at_not_null(connection):
+    from models import CrewMember, StaffMember
+
+    # Keyset pagination seeks on (created_at, id), so a NULL would fall off every page
+    for table in (CrewMember.__table__, StaffMember.__table__):
+        connection.execute(table.update().where(table.c.created_at.is_(None)).values(
+            created_at=sa.func.coalesce(table.c.updated_at, sa.func.current_timestamp()),
+            updated_at=table.c.updated_at
+        ))
+        if connection.dialect.name == 'postgresql':
+            # SQLite cannot alter a column constraint without rebuilding the table
+            connection.execute(sa.text(f'ALTER TABLE {table.name} ALTER COLUMN created_at SET NOT NULL'))
+
+
+# Migration 13 rebuilt ix_crew_members_active_created_at to steer SQLite's index choice. With the
+# status values inlined by active_crew_filter the planner picks that index whatever order the
+# indexes were created in, so the version is retired rather than reused
+
+
+@migration(14, 'Completion filter index on crew_members')
+def completion_created_at_index(connection):
+    create_named_index_if_missing(connection, 'ix_crew_members_completion_created_at', 'crew_members',
+                                  ['completion_percentage', 'created_at'])
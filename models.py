@@ -1,8 +1,103 @@
 from app import db
 from datetime import datetime
 from flask_login import UserMixin
-import secrets
-import hashlib
+from sqlalchemy import event
+import hmac
+
+from profile_tokens import make_profile_token, profile_token_version
+
+
+# Document types crew members can upload, grouped by category
+DOCUMENT_CATEGORIES = {
+    'identity': {
+        'name': 'Identity Documents',
+        'documents': [
+            {'type': 'passport', 'name': 'Passport Copy', 'required': True},
+            {'type': 'government_id', 'name': 'Government ID (Aadhaar / PAN / SSN)', 'required': False},
+            {'type': 'photo', 'name': 'Photo (Passport Size)', 'required': True},
+        ]
+    },
+    'medical': {
+        'name': 'Medical Documents',
+        'documents': [
+            {'type': 'medical_certificate', 'name': 'Medical Certificate', 'required': True},
+            {'type': 'yellow_fever', 'name': 'Yellow Fever Certificate', 'required': False},
+        ]
+    },
+    'professional': {
+        'name': 'Professional Documents',
+        'documents': [
+            {'type': 'cdc', 'name': 'CDC (Seaman Book)', 'required': True},
+            {'type': 'coc_cop', 'name': 'COC/COP Certificate', 'required': True},
+            {'type': 'stcw_certificates', 'name': 'STCW Certificates', 'required': True},
+            {'type': 'gmdss_dce', 'name': 'GMDSS/DCE Certificate', 'required': False},
+        ]
+    },
+    'other': {
+        'name': 'Other Documents',
+        'documents': [
+            {'type': 'resume', 'name': 'Resume/CV', 'required': True},
+            {'type': 'sea_agreement', 'name': 'SEA Agreement', 'required': False},
+        ]
+    }
+}
+
+
+CREW_STATUS_NAMES = {
+    0: "Registered",
+    1: "Screening",
+    2: "Documents Verified",
+    3: "Approved",
+    -1: "Rejected",
+    -2: "Flagged"
+}
+
+STAFF_STATUS_NAMES = {
+    1: "Screening",
+    3: "Approved",
+    -1: "Rejected"
+}
+
+
+def iter_document_types():
+    """Yield every document type definition across all categories"""
+    for category in DOCUMENT_CATEGORIES.values():
+        yield from category['documents']
+
+
+def document_category_for_type(document_type):
+    """Return the category key a document type belongs to, or 'other' if unknown"""
+    for category_key, category in DOCUMENT_CATEGORIES.items():
+        if any(doc['type'] == document_type for doc in category['documents']):
+            return category_key
+    return 'other'
+
+
+# Registration-era file columns on CrewMember, named after their document type
+LEGACY_FILE_COLUMNS = [f"{doc['type']}_file" for doc in iter_document_types()]
+
+
+# Bit assigned to each document type in CrewMember.document_mask (append new types only)
+DOCUMENT_TYPE_BITS = {doc['type']: 1 << index for index, doc in enumerate(iter_document_types())}
+REQUIRED_DOCUMENTS_MASK = sum(DOCUMENT_TYPE_BITS[doc['type']] for doc in iter_document_types() if doc['required'])
+
+
+def completion_percentage_for_mask(document_mask):
+    """Calculate profile completion percentage from a document type bitmask"""
+    required_count = bin(REQUIRED_DOCUMENTS_MASK).count('1')
+    if not required_count:
+        return 100
+    uploaded_count = bin((document_mask or 0) & REQUIRED_DOCUMENTS_MASK).count('1')
+    return uploaded_count * 100 // required_count
+
+
+def completion_percentage_expression(document_mask):
+    """completion_percentage_for_mask as a SQL expression, for updates that never read the row first"""
+    required_bits = [bit for bit in DOCUMENT_TYPE_BITS.values() if bit & REQUIRED_DOCUMENTS_MASK]
+    if not required_bits:
+        return db.literal(100)
+    uploaded_count = sum(db.case((document_mask.op('&')(bit) != 0, 1), else_=0) for bit in required_bits)
+    return uploaded_count * 100 // len(required_bits)
 
 
 class Admin(UserMixin, db.Model):
@@ -21,6 +116,17 @@ class Admin(UserMixin, db.Model):
 class CrewMember(db.Model):
     """Crew member model for registration and tracking"""
     __tablename__ = 'crew_members'
+    __table_args__ = (
+        db.Index('ix_crew_members_created_at', 'created_at'),
+        db.Index('ix_crew_members_updated_at', 'updated_at'),
+        db.Index('ix_crew_members_status_created_at', 'status', 'created_at'),
+        # Active pipeline (Registered, Screening, Documents Verified) is what admins page through most
+        db.Index('ix_crew_members_active_created_at', 'created_at',
+                 postgresql_where=db.text('status IN (0, 1, 2)'),
+                 sqlite_where=db.text('status IN (0, 1, 2)')),
+        # completion=complete lists page by created_at within a single completion value
+        db.Index('ix_crew_members_completion_created_at', 'completion_percentage', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False)
@@ -62,14 +168,19 @@ class CrewMember(db.Model):
     sea_agreement_file = db.Column(db.String(255))  # SEA Agreement (Optional)
     
     # Profile access token for secure private access
-    profile_token = db.Column(db.String(128), unique=True)
+    profile_token = db.Column(db.String(128), unique=True)  # Legacy random token, kept for links sent before signed tokens
+    token_version = db.Column(db.Integer)  # Version of the signed profile token, see profile_tokens; NULL until issued
+    
+    # Denormalized document completion, maintained by utils.save_crew_document
+    document_mask = db.Column(db.Integer, default=0, nullable=False)  # Bit per uploaded type, see DOCUMENT_TYPE_BITS
+    completion_percentage = db.Column(db.Integer, default=0, nullable=False, index=True)
     
     # Status and notes
     status = db.Column(db.Integer, default=0)  # 0=Registered, 1=Screening, 2=Documents Verified, 3=Approved, -1=Rejected, -2=Flagged
     admin_notes = db.Column(db.Text)
     screening_notes = db.Column(db.Text)
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Keyset pagination cursors need it
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
@@ -77,15 +188,28 @@ class CrewMember(db.Model):
     
     def get_status_name(self):
         """Get the human-readable status name"""
-        status_names = {
-            0: "Registered",
-            1: "Screening",
-            2: "Documents Verified", 
-            3: "Approved",
-            -1: "Rejected",
-            -2: "Flagged"
-        }
-        return status_names.get(self.status, "Unknown")
+        return CREW_STATUS_NAMES.get(self.status, "Unknown")
+    
+    def get_status_history(self):
+        """Status changes for this crew member, oldest first, memoized for the current request"""
+        if getattr(self, '_status_history', None) is None:
+            self._status_history = StatusEvent.query.options(db.joinedload(StatusEvent.admin)).filter_by(
+                entity_type='crew', entity_id=self.id
+            ).order_by(StatusEvent.id).all()
+        return self._status_history
+    
+    def get_status_reached_at(self):
+        """When this crew member most recently entered each status, for the tracking timeline"""
+        return {status_event.to_status: status_event.created_at for status_event in self.get_status_history()}
+    
+    def get_admin_notes(self):
+        """Notes from the latest admin status change, even when empty, else the legacy column"""
+        for status_event in reversed(self.get_status_history()):
+            # Screening notes are internal to the recruitment team; events without a from_status
+            # (registration, migration seed) are not admin decisions and carry no notes
+            if status_event.from_status is not None and status_event.to_status != 1:
+                return status_event.notes or ''
+        return self.admin_notes
     
     def get_status_class(self):
         """Get Bootstrap class for status"""
@@ -100,65 +224,73 @@ class CrewMember(db.Model):
         return status_classes.get(self.status, "secondary")
 
     def generate_profile_token(self):
-        """Generate a secure token for profile access"""
-        if not self.profile_token:
-            # Generate a secure random token
-            random_bytes = secrets.token_bytes(32)
-            # Create a hash that includes crew ID for uniqueness
-            token_data = f"{self.id}_{self.passport}_{random_bytes.hex()}"
-            self.profile_token = hashlib.sha256(token_data.encode()).hexdigest()
-            db.session.commit()
+        """Issue a signed profile token if the crew member has none; the caller commits"""
+        if self.token_version is None and not self.profile_token:
+            self.token_version = 1
+        return self.get_profile_token()
+    
+    def revoke_profile_token(self):
+        """Invalidate every profile link issued so far and issue a new one; the caller commits"""
+        crew_table = CrewMember.__table__
+        db.session.execute(
+            crew_table.update().where(crew_table.c.id == self.id).values(
+                # Bumped in SQL so concurrent revocations never settle on the same version
+                token_version=db.func.coalesce(crew_table.c.token_version, 0) + 1,
+                profile_token=None,
+                # Revoking a link is not an edit; keep incremental exports quiet
+                updated_at=crew_table.c.updated_at
+            )
+        )
+        db.session.expire(self, ['token_version', 'profile_token'])
+        return self.get_profile_token()
+    
+    def get_profile_token(self):
+        """Token for this crew member's private profile link, or None if none was issued"""
+        if self.token_version is not None:
+            return make_profile_token(self.id, self.token_version)
         return self.profile_token
     
+    def check_profile_token(self, token):
+        """Constant-time check of a profile link token against the current token"""
+        if self.token_version is not None:
+            return profile_token_version(self.id, token) == self.token_version
+        return bool(self.profile_token and token) and hmac.compare_digest(self.profile_token.encode('utf-8'), token.encode('utf-8'))
+    
+    def load_documents_by_type(self):
+        """Get all documents grouped by type in one query, memoized for the current request"""
+        # The instance lives in the request-scoped session, so the cache dies with it
+        if getattr(self, '_documents_by_type', None) is None:
+            documents_by_type = {}
+            documents = CrewDocument.query.filter_by(
+                crew_id=self.id
+            ).order_by(CrewDocument.upload_date.desc()).all()
+            for document in documents:
+                documents_by_type.setdefault(document.document_type, []).append(document)
+            self._documents_by_type = documents_by_type
+        return self._documents_by_type
+    
+    def invalidate_document_cache(self):
+        """Drop the memoized documents so the next lookup re-reads them"""
+        self._documents_by_type = None
+        self._duplicate_digests = None
+    
     def get_document_categories(self):
         """Get documents organized by categories with their status (new multi-file system)"""
-        categories = {
-            'identity': {
-                'name': 'Identity Documents',
-                'documents': [
-                    {'type': 'passport', 'name': 'Passport Copy', 'required': True},
-                    {'type': 'government_id', 'name': 'Government ID (Aadhaar / PAN / SSN)', 'required': False},
-                    {'type': 'photo', 'name': 'Photo (Passport Size)', 'required': True},
-                ]
-            },
-            'medical': {
-                'name': 'Medical Documents',
-                'documents': [
-                    {'type': 'medical_certificate', 'name': 'Medical Certificate', 'required': True},
-                    {'type': 'yellow_fever', 'name': 'Yellow Fever Certificate', 'required': False},
-                ]
-            },
-            'professional': {
-                'name': 'Professional Documents',
-                'documents': [
-                    {'type': 'cdc', 'name': 'CDC (Seaman Book)', 'required': True},
-                    {'type': 'coc_cop', 'name': 'COC/COP Certificate', 'required': True},
-                    {'type': 'stcw_certificates', 'name': 'STCW Certificates', 'required': True},
-                    {'type': 'gmdss_dce', 'name': 'GMDSS/DCE Certificate', 'required': False},
-                ]
-            },
-            'other': {
-                'name': 'Other Documents',
-                'documents': [
-                    {'type': 'resume', 'name': 'Resume/CV', 'required': True},
-                    {'type': 'sea_agreement', 'name': 'SEA Agreement', 'required': False},
-                ]
-            }
-        }
+        documents_by_type = self.load_documents_by_type()
+        categories = {}
         
-        # Check status of each document type using the new documents table
-        for category_key, category in categories.items():
-            for doc in category['documents']:
-                # Get all documents of this type for this crew member
-                doc_files = CrewDocument.query.filter_by(
-                    crew_id=self.id, 
-                    document_type=doc['type']
-                ).order_by(CrewDocument.upload_date.desc()).all()
+        for category_key, category in DOCUMENT_CATEGORIES.items():
+            documents = []
+            for doc_info in category['documents']:
+                doc = dict(doc_info)
+                doc_files = documents_by_type.get(doc['type'], [])
                 
                 doc['files'] = doc_files
                 doc['uploaded'] = len(doc_files) > 0
                 doc['status'] = 'complete' if doc['uploaded'] else 'missing'
                 doc['count'] = len(doc_files)
+                documents.append(doc)
+            categories[category_key] = {'name': category['name'], 'documents': documents}
         
         return categories
     
@@ -185,32 +317,64 @@ class CrewMember(db.Model):
             crew_id=self.id
         ).order_by(CrewDocument.upload_date.desc()).all()
     
+    def get_duplicate_digests(self):
+        """Digests of this crew member's documents that are stored more than once (by anyone)"""
+        if getattr(self, '_duplicate_digests', None) is None:
+            digests = {document.sha256 for documents in self.load_documents_by_type().values()
+                       for document in documents if document.sha256}
+            duplicates = set()
+            if digests:
+                duplicates = {digest for digest, in db.session.query(CrewDocument.sha256).filter(
+                    CrewDocument.sha256.in_(digests)
+                ).group_by(CrewDocument.sha256).having(db.func.count(CrewDocument.id) > 1)}
+            self._duplicate_digests = duplicates
+        return self._duplicate_digests
+    
     def get_profile_completion_percentage(self):
         """Calculate profile completion percentage based on new document system"""
-        categories = self.get_document_categories()
-        required_docs = []
-        uploaded_docs = []
-        
-        for category in categories.values():
-            for doc in category['documents']:
-                if doc['required']:
-                    required_docs.append(doc)
-                    if doc['uploaded']:
-                        uploaded_docs.append(doc)
+        documents_by_type = self.load_documents_by_type()
+        required_types = [doc['type'] for doc in iter_document_types() if doc['required']]
+        uploaded_types = [doc_type for doc_type in required_types if documents_by_type.get(doc_type)]
         
-        if not required_docs:
+        if not required_types:
             return 100
         
-        return int((len(uploaded_docs) / len(required_docs)) * 100)
+        return int((len(uploaded_types) / len(required_types)) * 100)
     
     def is_profile_complete(self):
         """Check if profile is 100% complete"""
         return self.get_profile_completion_percentage() == 100
+    
+    def mark_document_uploaded(self, document_type):
+        """Record an uploaded document type in the stored completion columns"""
+        crew_table = CrewMember.__table__
+        # OR-ed in SQL, so two uploads of different types at once never drop each other's bit
+        document_mask = crew_table.c.document_mask.op('|')(DOCUMENT_TYPE_BITS.get(document_type, 0))
+        db.session.execute(
+            crew_table.update().where(crew_table.c.id == self.id).values(
+                document_mask=document_mask,
+                completion_percentage=completion_percentage_expression(document_mask)
+            )
+        )
+        db.session.expire(self, ['document_mask', 'completion_percentage', 'updated_at'])
+        self.invalidate_document_cache()
+    
+    def refresh_document_completion(self):
+        """Recalculate the stored completion columns from the documents table"""
+        document_mask = 0
+        for document_type in self.load_documents_by_type():
+            document_mask |= DOCUMENT_TYPE_BITS.get(document_type, 0)
+        self.document_mask = document_mask
+        self.completion_percentage = completion_percentage_for_mask(document_mask)
 
 
 class CrewDocument(db.Model):
     """Document storage model for crew members - supports multiple files per category"""
     __tablename__ = 'crew_documents'
+    __table_args__ = (
+        db.Index('ix_crew_documents_crew_type_upload_date', 'crew_id', 'document_type', 'upload_date'),
+        db.Index('ix_crew_documents_crew_category_upload_date', 'crew_id', 'document_category', 'upload_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     crew_id = db.Column(db.Integer, db.ForeignKey('crew_members.id'), nullable=False)
@@ -220,6 +384,8 @@ class CrewDocument(db.Model):
     original_filename = db.Column(db.String(255), nullable=False)
     file_size = db.Column(db.Integer)
     mime_type = db.Column(db.String(100))
+    sha256 = db.Column(db.String(64), index=True)  # Content digest; filename points at the shared blob
+    thumbnail_filename = db.Column(db.String(255))  # JPEG preview, filled in by the background worker
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship back to crew member
@@ -241,9 +407,57 @@ class CrewDocument(db.Model):
         return f"{file_size:.1f} TB"
 
 
+class StoredBlob(db.Model):
+    """Content-addressed file shared by every CrewDocument with the same SHA-256"""
+    __tablename__ = 'stored_blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    file_size = db.Column(db.Integer)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StoredBlob {self.sha256[:12]} refs={self.ref_count}>'
+
+
+@event.listens_for(CrewDocument, 'after_delete')
+def clear_document_type_bit(mapper, connection, document):
+    """Clear a document type from the crew member's completion columns once its last file is deleted"""
+    crew_table = CrewMember.__table__
+    documents_table = CrewDocument.__table__
+    document_mask = crew_table.c.document_mask.op('&')(~DOCUMENT_TYPE_BITS.get(document.document_type, 0))
+    same_type_remains = db.select(documents_table.c.id).where(
+        documents_table.c.crew_id == document.crew_id,
+        documents_table.c.document_type == document.document_type
+    ).exists()
+    connection.execute(
+        crew_table.update().where(crew_table.c.id == document.crew_id, ~same_type_remains).values(
+            document_mask=document_mask,
+            completion_percentage=completion_percentage_expression(document_mask)
+        )
+    )
+
+
+@event.listens_for(CrewDocument, 'after_delete')
+def release_document_blob(mapper, connection, document):
+    """Drop a blob reference when its document row goes away"""
+    if document.sha256:
+        connection.execute(
+            StoredBlob.__table__.update()
+            .where(StoredBlob.__table__.c.sha256 == document.sha256)
+            .values(ref_count=StoredBlob.__table__.c.ref_count - 1)
+        )
+
+
 class StaffMember(db.Model):
     """Staff member model for offshore/office staff registration"""
     __tablename__ = 'staff_members'
+    __table_args__ = (
+        db.Index('ix_staff_members_created_at', 'created_at'),
+        db.Index('ix_staff_members_updated_at', 'updated_at'),
+        db.Index('ix_staff_members_status_created_at', 'status', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(128), nullable=False)
@@ -270,7 +484,7 @@ class StaffMember(db.Model):
     admin_notes = db.Column(db.Text)
     screening_notes = db.Column(db.Text)
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Keyset pagination cursors need it
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
@@ -278,12 +492,24 @@ class StaffMember(db.Model):
     
     def get_status_name(self):
         """Get the human-readable status name"""
-        status_names = {
-            1: "Screening",
-            3: "Approved",
-            -1: "Rejected"
-        }
-        return status_names.get(self.status, "Unknown")
+        return STAFF_STATUS_NAMES.get(self.status, "Unknown")
+    
+    def get_status_history(self):
+        """Status changes for this staff member, oldest first, memoized for the current request"""
+        if getattr(self, '_status_history', None) is None:
+            self._status_history = StatusEvent.query.options(db.joinedload(StatusEvent.admin)).filter_by(
+                entity_type='staff', entity_id=self.id
+            ).order_by(StatusEvent.id).all()
+        return self._status_history
+    
+    def get_admin_notes(self):
+        """Notes from the latest admin status change, even when empty, else the legacy column"""
+        for status_event in reversed(self.get_status_history()):
+            # Screening notes are internal to the recruitment team; events without a from_status
+            # (registration, migration seed) are not admin decisions and carry no notes
+            if status_event.from_status is not None and status_event.to_status != 1:
+                return status_event.notes or ''
+        return self.admin_notes
     
     def get_status_class(self):
         """Get Bootstrap class for status"""
@@ -292,4 +518,111 @@ class StaffMember(db.Model):
             3: "success",
             -1: "danger"
         }
-        return status_classes.get(self.status, "warning")
\ No newline at end of file
+        return status_classes.get(self.status, "warning")
+
+
+class ExportJob(db.Model):
+    """Background CSV export written in batches and kept in upload storage"""
+    __tablename__ = 'export_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(16), nullable=False)  # crew, staff
+    filters = db.Column(db.Text)  # JSON-encoded list view filters
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, running, complete, failed
+    total_rows = db.Column(db.Integer)
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    file_path = db.Column(db.String(255))  # Storage key of the finished CSV, see exports.EXPORT_PREFIX
+    file_size = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    admin_id = db.Column(db.Integer, db.ForeignKey('admins.id'))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Refreshed with every committed batch; goes stale when the worker dies
+    
+    def __repr__(self):
+        return f'<ExportJob {self.id} {self.entity} {self.status}>'
+    
+    def get_progress_percentage(self):
+        """Percentage of rows written so far"""
+        if self.status == 'complete':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int((self.rows_written / self.total_rows) * 100))
+    
+    def get_status_class(self):
+        """Get Bootstrap class for status"""
+        status_classes = {
+            'pending': "secondary",
+            'running': "info",
+            'complete': "success",
+            'failed': "danger"
+        }
+        return status_classes.get(self.status, "secondary")
+    
+    def get_download_name(self):
+        """File name offered to the browser when downloading the finished export"""
+        return f"{self.entity}_export_{self.created_at.strftime('%Y%m%d_%H%M%S')}.csv"
+    
+    def to_dict(self):
+        """Progress snapshot for dashboard polling"""
+        return {
+            'id': self.id,
+            'entity': self.entity,
+            'status': self.status,
+            'rows_written': self.rows_written,
+            'total_rows': self.total_rows,
+            'progress': self.get_progress_percentage(),
+            'error': self.error,
+        }
+
+
+class StatusEvent(db.Model):
+    """Append-only log of status changes; the current status stays denormalized on the entity row"""
+    __tablename__ = 'status_events'
+    __table_args__ = (
+        # Timeline and "latest event per entity" are both a backward scan of one entity's range
+        db.Index('ix_status_events_entity_id', 'entity_type', 'entity_id', 'id'),
+        # Pipeline analytics: who reached a status, and when
+        db.Index('ix_status_events_to_status_created_at', 'entity_type', 'to_status', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(16), nullable=False)  # crew, staff
+    entity_id = db.Column(db.Integer, nullable=False)
+    from_status = db.Column(db.Integer)  # NULL for the event recorded at registration
+    to_status = db.Column(db.Integer, nullable=False)
+    admin_id = db.Column(db.Integer, db.ForeignKey('admins.id'))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    admin = db.relationship('Admin')
+    
+    def __repr__(self):
+        return f'<StatusEvent {self.entity_type} {self.entity_id} {self.from_status}->{self.to_status}>'
+    
+    def get_status_name(self):
+        """Get the human-readable name of the status this event moved to"""
+        status_names = CREW_STATUS_NAMES if self.entity_type == 'crew' else STAFF_STATUS_NAMES
+        return status_names.get(self.to_status, "Unknown")
+
+
+def record_status_events(entity_type, transitions, admin_id=None, notes=None):
+    """Append one event per (entity_id, from_status, to_status) in a single multi-row INSERT; the caller commits"""
+    if not transitions:
+        return
+    created_at = datetime.utcnow()
+    db.session.execute(db.insert(StatusEvent), [
+        {
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'from_status': from_status,
+            'to_status': to_status,
+            'admin_id': admin_id,
+            'notes': notes or None,
+            'created_at': created_at,
+        }
+        for entity_id, from_status, to_status in transitions
+    ])
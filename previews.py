@@ -0,0 +1,106 @@
+"""Thumbnails for uploaded images and first-page previews for PDFs.
+
+Previews are generated on their own background pool after a document is saved. Like the
+documents themselves they are keyed by content digest, so identical uploads share
+one preview and a preview never changes once written.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+
+from flask import current_app
+
+from storage import get_storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Image thumbnails are skipped without Pillow
+    Image = None
+
+THUMBNAIL_PREFIX = 'crew_documents/thumbnails/'
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+PDF_EXTENSIONS = {'.pdf'}
+
+
+def thumbnail_filename(digest):
+    """Storage key of the preview for a document's content digest"""
+    return f"{THUMBNAIL_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+
+
+def _image_thumbnail(source_path, target_path, size):
+    if Image is None:
+        return False
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size)
+        image.convert('RGB').save(target_path, 'JPEG', quality=80, optimize=True)
+    return True
+
+
+def _pdf_preview(source_path, target_path, size):
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        return False
+    # Render only the first page, already scaled down, straight to JPEG
+    output_prefix = target_path[:-len('.jpg')]
+    subprocess.run(
+        [pdftoppm, '-f', '1', '-l', '1', '-singlefile', '-jpeg', '-scale-to', str(max(size)),
+         source_path, output_prefix],
+        check=True, capture_output=True, timeout=current_app.config['PREVIEW_TIMEOUT']
+    )
+    return True
+
+
+def render_preview(source_path, extension, target_path):
+    """Write a JPEG preview of source_path to target_path; False when no renderer is available"""
+    size = current_app.config['THUMBNAIL_SIZE']
+    if extension in IMAGE_EXTENSIONS:
+        return _image_thumbnail(source_path, target_path, size)
+    if extension in PDF_EXTENSIONS:
+        return _pdf_preview(source_path, target_path, size)
+    return False
+
+
+def generate_document_preview(document_id):
+    """Create the preview for a CrewDocument and record it on the row"""
+    from models import CrewDocument, db  # Import here to avoid circular imports
+
+    document = db.session.get(CrewDocument, document_id)
+    if document is None or document.thumbnail_filename or not document.sha256:
+        return None
+
+    storage = get_storage()
+    key = thumbnail_filename(document.sha256)
+    if not storage.exists(key):
+        extension = os.path.splitext(document.filename)[1].lower()
+        temp_folder = current_app.config['UPLOAD_TEMP_FOLDER']
+        os.makedirs(temp_folder, exist_ok=True)
+
+        with tempfile.TemporaryDirectory(dir=temp_folder) as work_dir:
+            source_path = os.path.join(work_dir, f'source{extension}')
+            target_path = os.path.join(work_dir, 'preview.jpg')
+            with storage.open(document.filename) as source, open(source_path, 'wb') as target:
+                shutil.copyfileobj(source, target, 64 * 1024)
+
+            try:
+                rendered = render_preview(source_path, extension, target_path)
+            except Exception as exc:
+                # Unreadable scans are common; the document just keeps its icon
+                current_app.logger.warning(f'Preview failed for document {document_id}: {exc}')
+                return None
+            if not rendered:
+                return None
+            storage.save_file(key, target_path)
+
+    document.thumbnail_filename = key
+    db.session.commit()
+    return key
+
+
+def queue_document_preview(document_id):
+    """Generate a document's preview on the preview worker"""
+    from tasks import submit_preview  # Import here to avoid circular imports
+
+    return submit_preview(generate_document_preview, document_id)
@@ -0,0 +1,38 @@
+"""HMAC-signed tokens for crew members' private profile links.
+
+A token is "<version>.<signature>" where the signature is an HMAC of (crew id, version)
+keyed from SECRET_KEY, so nothing secret is stored per crew member and a forged link is
+turned away with a hash instead of a database read. Bumping CrewMember.token_version
+revokes every link issued before it. Crew who registered before signed tokens keep
+their stored random profile_token.
+"""
+import hashlib
+import hmac
+
+from flask import current_app
+
+
+def _profile_signature(crew_id, version):
+    key = hashlib.sha256(b'maricheck-profile-token:' + current_app.secret_key.encode('utf-8')).digest()
+    message = f'{crew_id}\n{version}'.encode('utf-8')
+    return hmac.new(key, message, hashlib.sha256).hexdigest()[:32]
+
+
+def make_profile_token(crew_id, version):
+    """Signed token for a crew member's profile link at the given token version"""
+    return f'{version}.{_profile_signature(crew_id, version)}'
+
+
+def profile_token_version(crew_id, token):
+    """Version a signed token was issued at, or None when it is forged, malformed or a legacy token"""
+    version, separator, signature = (token or '').partition('.')
+    if not separator or not version.isdigit():
+        return None
+    if not hmac.compare_digest(signature.encode('utf-8'), _profile_signature(crew_id, int(version)).encode('utf-8')):
+        return None
+    return int(version)
+
+
+def is_forged_profile_token(crew_id, token):
+    """True for a token in the signed format whose signature does not match; needs no database read"""
+    return '.' in (token or '') and profile_token_version(crew_id, token) is None
@@ -1,16 +1,49 @@
 import os
-import csv
-from io import StringIO
-from datetime import datetime
-from flask import render_template, request, redirect, url_for, flash, session, make_response, send_from_directory
+import json
+import base64
+import mimetypes
+import posixpath
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+from flask import abort, render_template, request, redirect, url_for, flash, session, make_response, send_from_directory, send_file, jsonify, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash
 from werkzeug.utils import secure_filename
 
 from app import app, db
-from models import Admin, CrewMember, StaffMember, CrewDocument
+from models import Admin, CrewMember, StaffMember, CrewDocument, ExportJob, CREW_STATUS_NAMES, STAFF_STATUS_NAMES, document_category_for_type, record_status_events
 from forms import CrewRegistrationForm, StaffRegistrationForm, TrackingForm, AdminLoginForm, CrewProfileDocumentForm
-from utils import save_uploaded_file, save_multiple_crew_documents
+from exports import CREW_EXPORT_COLUMNS, STAFF_EXPORT_COLUMNS, EXPORT_PREFIX, iter_csv, iter_gzip, run_export_job, requeue_stale_export_jobs
+from imaging import ORIGINALS_PREFIX
+from previews import THUMBNAIL_PREFIX
+from profile_tokens import is_forged_profile_token, profile_token_version
+from search import matching_ids, search_all
+from stats import get_dashboard_stats, invalidate_dashboard_stats
+from storage import get_storage
+from tasks import submit
+from uploads import ChunkedUploadError, create_upload, load_upload, append_chunk, finish_upload
+from url_signing import signed_upload_url, verify_upload_signature
+from utils import save_uploaded_file, save_crew_documents, keyset_paginate, iter_crew_documents_zip, content_digest
+
+
+PAGE_SIZE_CHOICES = (25, 50, 100, 200)
+
+# Registered, Screening and Documents Verified: the pipeline admins page through most
+ACTIVE_CREW_STATUSES = (0, 1, 2)
+
+# Status each admin action moves a record to
+CREW_STATUS_ACTIONS = {'approve': 3, 'reject': -1, 'flag': -2, 'screening': 1, 'verified': 2}
+STAFF_STATUS_ACTIONS = {'approve': 3, 'reject': -1, 'screening': 1}
+
+# List filters carried through a bulk action so the admin lands back on the same page
+LIST_FILTER_FIELDS = ('search', 'status', 'completion', 'per_page')
+
+
+def get_page_size():
+    """Read the per-page size from the query string, falling back to the default"""
+    page_size = request.args.get('per_page', type=int)
+    return page_size if page_size in PAGE_SIZE_CHOICES else 50
 
 
 @app.route('/')
@@ -49,19 +82,26 @@ def register_crew():
             emergency_contact_relationship=form.emergency_contact_relationship.data
         )
         
-        # Handle file uploads - Core documents only for registration
+        db.session.add(crew_member)
+        db.session.flush()  # Assigns the id the document rows, first status event and profile token point at
+        record_status_events('crew', [(crew_member.id, None, crew_member.status)])
+        
+        # Generate profile token for secure access; signed, so it is saved with the registration
+        crew_member.generate_profile_token()
+        
+        # Handle file uploads - Core documents only for registration; they land in crew_documents
+        # like every later upload, in the same transaction as the crew member
         file_fields = ['passport_file', 'cdc_file', 'resume_file', 'photo_file', 'medical_certificate_file']
+        uploads = []
         for field_name in file_fields:
             file_field = getattr(form, field_name)
             if file_field.data:
-                filename = save_uploaded_file(file_field.data, 'crew')
-                setattr(crew_member, field_name, filename)
+                document_type = field_name[:-len('_file')]
+                uploads.append((file_field.data, document_type, document_category_for_type(document_type)))
         
-        db.session.add(crew_member)
-        db.session.commit()
-        
-        # Generate profile token for secure access
-        crew_member.generate_profile_token()
+        if not save_crew_documents(uploads, crew_member.id):
+            db.session.commit()
+        invalidate_dashboard_stats()
         
         flash('Registration successful! Your application has been submitted. Our team will review your profile and contact you with the next steps.', 'success')
         return redirect(url_for('track_status', passport=crew_member.passport))
@@ -100,7 +140,10 @@ def register_staff():
                 setattr(staff_member, field_name, filename)
         
         db.session.add(staff_member)
+        db.session.flush()  # Assigns the id the first status event points at
+        record_status_events('staff', [(staff_member.id, None, staff_member.status)])
         db.session.commit()
+        invalidate_dashboard_stats()
         
         flash('Registration successful! Your application has been submitted.', 'success')
         return redirect(url_for('index'))
@@ -127,13 +170,12 @@ def track_status():
     return render_template('track_status.html', form=form, crew_member=crew_member)
 
 
-@app.route('/my-profile/<int:crew_id>-<token>')
+@app.route('/my-profile/<int:crew_id>-<token>', methods=['GET', 'POST'])
 def crew_private_profile(crew_id, token):
     """Crew member private profile for document uploads"""
-    crew_member = CrewMember.query.get_or_404(crew_id)
-    
-    # Verify token
-    if not crew_member.profile_token or crew_member.profile_token != token:
+    # Verify token; a forged signed token is rejected before the crew row is read
+    crew_member = None if is_forged_profile_token(crew_id, token) else CrewMember.query.get_or_404(crew_id)
+    if not crew_member or not crew_member.check_profile_token(token):
         flash('Invalid or expired profile link.', 'error')
         return redirect(url_for('index'))
     
@@ -159,24 +201,24 @@ def crew_private_profile(crew_id, token):
             'sea_agreement': {'category': 'other', 'name': 'SEA Agreement'},
         }
         
-        # Handle all document fields
+        # Collect every selected file so all documents are saved in one transaction
+        uploads = []
         for field_name, doc_info in document_categories.items():
             file_field = getattr(document_form, field_name)
-            if file_field.data:
-                # Save multiple files for this document type
-                saved_docs = save_multiple_crew_documents(
-                    file_field.data, 
-                    crew_member.id, 
-                    field_name, 
-                    doc_info['category']
-                )
-                if saved_docs:
-                    count = len(saved_docs)
-                    updated_docs.append(f"{doc_info['name']} ({count} file{'s' if count > 1 else ''})")
+            for file in file_field.data or []:
+                if file and file.filename:
+                    uploads.append((file, field_name, doc_info['category']))
         
-        if updated_docs:
+        if uploads:
             crew_member.updated_at = datetime.utcnow()
-            db.session.commit()
+        saved_counts = Counter(doc.document_type for doc in save_crew_documents(uploads, crew_member.id))
+        
+        for field_name, doc_info in document_categories.items():
+            count = saved_counts.get(field_name)
+            if count:
+                updated_docs.append(f"{doc_info['name']} ({count} file{'s' if count > 1 else ''})")
+        
+        if updated_docs:
             flash(f'Successfully uploaded: {", ".join(updated_docs)}', 'success')
         else:
             flash('No files were selected for upload.', 'warning')
@@ -188,6 +230,105 @@ def crew_private_profile(crew_id, token):
                          document_form=document_form)
 
 
+TUS_VERSION = '1.0.0'
+
+
+def get_profile_crew_member_or_404(crew_id, token):
+    """Load a crew member for a private profile URL, 404 if the token doesn't match"""
+    if is_forged_profile_token(crew_id, token):
+        abort(404)
+    crew_member = CrewMember.query.get_or_404(crew_id)
+    if not crew_member.check_profile_token(token):
+        abort(404)
+    return crew_member
+
+
+def parse_upload_metadata(header):
+    """Decode a tus Upload-Metadata header ('key base64value,key base64value')"""
+    metadata = {}
+    for pair in (header or '').split(','):
+        key, _, value = pair.strip().partition(' ')
+        if key:
+            try:
+                metadata[key] = base64.b64decode(value).decode('utf-8') if value else ''
+            except ValueError:
+                raise ChunkedUploadError('Malformed Upload-Metadata header')
+    return metadata
+
+
+def chunked_upload_response(state, status_code=204, body=None):
+    """Response carrying the tus offset headers for an upload"""
+    response = jsonify(body) if body is not None else make_response('', status_code)
+    response.status_code = status_code
+    response.headers['Tus-Resumable'] = TUS_VERSION
+    response.headers['Upload-Offset'] = str(state['offset'])
+    response.headers['Upload-Length'] = str(state['length'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.errorhandler(ChunkedUploadError)
+def handle_chunked_upload_error(error):
+    response = jsonify({'error': str(error)})
+    response.status_code = error.status_code
+    response.headers['Tus-Resumable'] = TUS_VERSION
+    return response
+
+
+@app.route('/my-profile/<int:crew_id>-<token>/uploads', methods=['POST'])
+def create_chunked_upload(crew_id, token):
+    """Start a resumable document upload"""
+    crew_member = get_profile_crew_member_or_404(crew_id, token)
+    metadata = parse_upload_metadata(request.headers.get('Upload-Metadata'))
+    
+    state = create_upload(
+        crew_member.id,
+        metadata.get('document_type'),
+        metadata.get('filename'),
+        request.headers.get('Upload-Length', type=int),
+        metadata.get('content_type')
+    )
+    
+    location = url_for('chunked_upload', crew_id=crew_id, token=token, upload_id=state['upload_id'])
+    response = chunked_upload_response(state, 201, {
+        'upload_id': state['upload_id'],
+        'location': location,
+        'chunk_size': app.config['CHUNKED_UPLOAD_CHUNK_SIZE'],
+    })
+    response.headers['Location'] = location
+    return response
+
+
+@app.route('/my-profile/<int:crew_id>-<token>/uploads/<upload_id>', methods=['HEAD', 'PATCH'])
+def chunked_upload(crew_id, token, upload_id):
+    """Report the current offset (HEAD) or append the next chunk (PATCH)"""
+    # Signed tokens are checked without a query on every chunk; the token version was
+    # checked against the row when the upload was created. Legacy tokens need the row.
+    if profile_token_version(crew_id, token) is None:
+        get_profile_crew_member_or_404(crew_id, token)
+    state = load_upload(upload_id, crew_id)
+    
+    if request.method == 'HEAD':
+        return chunked_upload_response(state, 200)
+    
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        raise ChunkedUploadError('Upload-Offset header is required')
+    
+    append_chunk(state, offset, request.get_data(cache=False), request.headers.get('Upload-Checksum'))
+    
+    if state['offset'] < state['length']:
+        return chunked_upload_response(state)
+    
+    # The crew member may have been deleted while the chunks were arriving
+    crew_member = CrewMember.query.get_or_404(crew_id)
+    document = finish_upload(state)
+    crew_member.updated_at = datetime.utcnow()
+    db.session.commit()
+    flash(f'Successfully uploaded: {document.original_filename}', 'success')
+    return chunked_upload_response(state, 200, {'complete': True, 'document_id': document.id})
+
+
 @app.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
     """Admin login"""
@@ -222,16 +363,18 @@ def admin_logout():
 def admin_dashboard():
     """Admin dashboard"""
     # Get statistics
-    total_crew = CrewMember.query.count()
-    total_staff = StaffMember.query.count()
-    crew_screening = CrewMember.query.filter_by(status=1).count()
-    staff_screening = StaffMember.query.filter_by(status=1).count()
-    crew_approved = CrewMember.query.filter_by(status=3).count()
-    staff_approved = StaffMember.query.filter_by(status=3).count()
+    stats = get_dashboard_stats()
+    total_crew = sum(stats['crew'].values())
+    total_staff = sum(stats['staff'].values())
+    crew_screening = stats['crew'].get(1, 0)
+    staff_screening = stats['staff'].get(1, 0)
+    crew_approved = stats['crew'].get(3, 0)
+    staff_approved = stats['staff'].get(3, 0)
     
     # Get recent registrations
     recent_crew = CrewMember.query.order_by(CrewMember.created_at.desc()).limit(5).all()
     recent_staff = StaffMember.query.order_by(StaffMember.created_at.desc()).limit(5).all()
+    export_jobs = ExportJob.query.order_by(ExportJob.created_at.desc()).limit(5).all()
     
     return render_template('admin/dashboard.html',
                          total_crew=total_crew,
@@ -241,41 +384,80 @@ def admin_dashboard():
                          crew_approved=crew_approved,
                          staff_approved=staff_approved,
                          recent_crew=recent_crew,
-                         recent_staff=recent_staff)
+                         recent_staff=recent_staff,
+                         export_jobs=export_jobs)
 
 
-@app.route('/admin/crew')
-@login_required
-def crew_list():
-    """Crew member list"""
-    status_filter = request.args.get('status')
-    search = request.args.get('search', '')
+def parse_updated_since(value):
+    """Parse an ISO 8601 updated_since watermark, aborting with 400 when it is malformed"""
+    if not value:
+        return None
+    try:
+        updated_since = datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, description='updated_since must be an ISO 8601 timestamp')
+    # Stored timestamps are naive UTC
+    if updated_since.tzinfo is not None:
+        updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+    return updated_since
+
+
+def is_identifier_search(search):
+    """Terms with digits look like passport or document numbers, which are searched by substring"""
+    return any(character.isdigit() for character in search)
+
+
+def active_crew_filter():
+    """status IN (0, 1, 2) with the values inlined, which is what lets SQLite match the partial index"""
+    return CrewMember.status.in_(db.bindparam('active_statuses', ACTIVE_CREW_STATUSES, expanding=True, literal_execute=True))
+
+
+def filtered_crew_query(args):
+    """Build the crew query for the status, completion, search and updated_since filters in args"""
+    status_filter = args.get('status')
+    completion_filter = args.get('completion')
+    search = args.get('search', '')
+    updated_since = parse_updated_since(args.get('updated_since'))
     
     query = CrewMember.query
     
-    if status_filter:
+    if status_filter == 'active':
+        # Served by the partial ix_crew_members_active_created_at index
+        query = query.filter(active_crew_filter())
+    elif status_filter:
         query = query.filter(CrewMember.status == int(status_filter))
     
+    if completion_filter == 'complete':
+        query = query.filter(CrewMember.completion_percentage == 100)
+    elif completion_filter == 'incomplete':
+        query = query.filter(CrewMember.completion_percentage < 100)
+    
     if search:
-        query = query.filter(
-            db.or_(
-                CrewMember.name.ilike(f'%{search}%'),
-                CrewMember.passport.ilike(f'%{search}%'),
-                CrewMember.rank.ilike(f'%{search}%')
-            )
+        substring_match = db.or_(
+            CrewMember.name.ilike(f'%{search}%'),
+            CrewMember.passport.ilike(f'%{search}%'),
+            CrewMember.rank.ilike(f'%{search}%')
         )
+        search_ids = matching_ids('crew', search)
+        if search_ids is None:
+            query = query.filter(substring_match)
+        elif is_identifier_search(search):
+            # Full-text search only matches word prefixes, so "1234" would miss "A1234567"
+            query = query.filter(db.or_(CrewMember.id.in_(db.select(search_ids.c.id)), substring_match))
+        else:
+            query = query.filter(CrewMember.id.in_(db.select(search_ids.c.id)))
     
-    crew_members = query.order_by(CrewMember.created_at.desc()).all()
+    if updated_since:
+        query = query.filter(CrewMember.updated_at >= updated_since)
     
-    return render_template('admin/crew_list.html', crew_members=crew_members, search=search, status_filter=status_filter)
+    return query
 
 
-@app.route('/admin/staff')
-@login_required
-def staff_list():
-    """Staff member list"""
-    status_filter = request.args.get('status')
-    search = request.args.get('search', '')
+def filtered_staff_query(args):
+    """Build the staff query for the status, search and updated_since filters in args"""
+    status_filter = args.get('status')
+    search = args.get('search', '')
+    updated_since = parse_updated_since(args.get('updated_since'))
     
     query = StaffMember.query
     
@@ -283,17 +465,113 @@ def staff_list():
         query = query.filter(StaffMember.status == int(status_filter))
     
     if search:
-        query = query.filter(
-            db.or_(
-                StaffMember.full_name.ilike(f'%{search}%'),
-                StaffMember.position_applying.ilike(f'%{search}%'),
-                StaffMember.department.ilike(f'%{search}%')
-            )
+        substring_match = db.or_(
+            StaffMember.full_name.ilike(f'%{search}%'),
+            StaffMember.position_applying.ilike(f'%{search}%'),
+            StaffMember.department.ilike(f'%{search}%')
         )
+        search_ids = matching_ids('staff', search)
+        if search_ids is None:
+            query = query.filter(substring_match)
+        elif is_identifier_search(search):
+            # Full-text search only matches word prefixes, so "1234" would miss "A1234567"
+            query = query.filter(db.or_(StaffMember.id.in_(db.select(search_ids.c.id)), substring_match))
+        else:
+            query = query.filter(StaffMember.id.in_(db.select(search_ids.c.id)))
+    
+    if updated_since:
+        query = query.filter(StaffMember.updated_at >= updated_since)
+    
+    return query
+
+
+def list_total_count(entity, args, page):
+    """Total for a list's header badge without a COUNT over the table, or None when unknown
+    
+    Unfiltered and status-only lists read the cached dashboard counts; any other filter only
+    gets an exact figure when the result fits on one page.
+    """
+    if not any(args.get(field) for field in ('search', 'completion', 'updated_since')):
+        counts = get_dashboard_stats()[entity]
+        status_filter = args.get('status')
+        if not status_filter:
+            return sum(counts.values())
+        if status_filter == 'active' and entity == 'crew':
+            return sum(counts.get(status, 0) for status in ACTIVE_CREW_STATUSES)
+        return counts.get(int(status_filter), 0)
+    if not page.prev_cursor and not page.next_cursor:
+        return len(page.items)
+    return None
+
+
+@app.route('/admin/crew')
+@login_required
+def crew_list():
+    """Crew member list"""
+    status_filter = request.args.get('status')
+    completion_filter = request.args.get('completion')
+    search = request.args.get('search', '')
+    
+    query = filtered_crew_query(request.args)
     
-    staff_members = query.order_by(StaffMember.created_at.desc()).all()
+    per_page = get_page_size()
+    page = keyset_paginate(query, CrewMember,
+                           after=request.args.get('after'),
+                           before=request.args.get('before'),
+                           page_size=per_page)
+    total_count = list_total_count('crew', request.args, page)
     
-    return render_template('admin/staff_list.html', staff_members=staff_members, search=search, status_filter=status_filter)
+    return render_template('admin/crew_list.html', crew_members=page.items, page=page, search=search,
+                         total_count=total_count, status_filter=status_filter, completion_filter=completion_filter,
+                         per_page=per_page, page_size_choices=PAGE_SIZE_CHOICES)
+
+
+@app.route('/admin/staff')
+@login_required
+def staff_list():
+    """Staff member list"""
+    status_filter = request.args.get('status')
+    search = request.args.get('search', '')
+    
+    query = filtered_staff_query(request.args)
+    
+    per_page = get_page_size()
+    page = keyset_paginate(query, StaffMember,
+                           after=request.args.get('after'),
+                           before=request.args.get('before'),
+                           page_size=per_page)
+    total_count = list_total_count('staff', request.args, page)
+    
+    return render_template('admin/staff_list.html', staff_members=page.items, page=page, search=search,
+                         total_count=total_count, status_filter=status_filter, per_page=per_page,
+                         page_size_choices=PAGE_SIZE_CHOICES)
+
+
+@app.route('/admin/search')
+@login_required
+def admin_search():
+    """Ranked search across crew, staff and document filenames"""
+    search = request.args.get('q', '').strip()
+    ranked = search_all(search, limit=100) if search else []
+    
+    # Load each entity type in one query, then restore the ranked order
+    models_by_type = {'crew': CrewMember, 'staff': StaffMember, 'document': CrewDocument}
+    loaded = {}
+    for entity_type, model in models_by_type.items():
+        ids = [entity_id for result_type, entity_id, _ in ranked if result_type == entity_type]
+        if ids:
+            query = model.query.filter(model.id.in_(ids))
+            if model is CrewDocument:
+                query = query.options(db.joinedload(CrewDocument.crew_member))
+            loaded[entity_type] = {record.id: record for record in query}
+    
+    results = []
+    for entity_type, entity_id, rank in ranked:
+        record = loaded.get(entity_type, {}).get(entity_id)
+        if record:
+            results.append({'type': entity_type, 'record': record, 'rank': rank})
+    
+    return render_template('admin/search.html', search=search, results=results)
 
 
 @app.route('/admin/crew/<int:crew_id>')
@@ -304,6 +582,18 @@ def crew_profile(crew_id):
     return render_template('admin/crew_profile.html', crew_member=crew_member)
 
 
+@app.route('/admin/crew/<int:crew_id>/documents.zip')
+@login_required
+def download_crew_documents(crew_id):
+    """Stream every document of a crew member as one ZIP, organized by category"""
+    crew_member = CrewMember.query.get_or_404(crew_id)
+    filename = secure_filename(f'{crew_member.name}_{crew_member.passport}_documents.zip')
+    
+    response = Response(stream_with_context(iter_crew_documents_zip(crew_member)), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
 @app.route('/admin/staff/<int:staff_id>')
 @login_required
 def staff_profile(staff_id):
@@ -319,31 +609,45 @@ def update_crew_status(crew_id):
     crew_member = CrewMember.query.get_or_404(crew_id)
     action = request.form.get('action')
     notes = request.form.get('notes', '')
+    previous_status = crew_member.status
     
     if action == 'approve':
         crew_member.status = 3
-        crew_member.admin_notes = notes
         flash('Crew member approved successfully.', 'success')
     elif action == 'reject':
         crew_member.status = -1
-        crew_member.admin_notes = notes
         flash('Crew member rejected.', 'warning')
     elif action == 'flag':
         crew_member.status = -2
-        crew_member.admin_notes = notes
         flash('Crew member flagged for review.', 'info')
     elif action == 'screening':
         crew_member.status = 1
-        crew_member.screening_notes = notes
         flash('Crew member moved to screening.', 'info')
     elif action == 'verified':
         crew_member.status = 2
-        crew_member.admin_notes = notes
         flash('Documents verified.', 'success')
+    else:
+        flash('Unknown status action.', 'error')
+        return redirect(url_for('crew_profile', crew_id=crew_id))
     
+    # Appended to the history instead of rewriting the notes columns on every transition
+    record_status_events('crew', [(crew_member.id, previous_status, crew_member.status)], admin_id=current_user.id, notes=notes)
     crew_member.updated_at = datetime.utcnow()
     db.session.commit()
+    invalidate_dashboard_stats()
+    
+    return redirect(url_for('crew_profile', crew_id=crew_id))
+
+
+@app.route('/admin/crew/<int:crew_id>/revoke_profile_link', methods=['POST'])
+@login_required
+def revoke_crew_profile_link(crew_id):
+    """Invalidate a crew member's private profile links and issue a new one"""
+    crew_member = CrewMember.query.get_or_404(crew_id)
+    crew_member.revoke_profile_token()
+    db.session.commit()
     
+    flash('Profile link revoked. Share the new link with the crew member.', 'warning')
     return redirect(url_for('crew_profile', crew_id=crew_id))
 
 
@@ -354,90 +658,286 @@ def update_staff_status(staff_id):
     staff_member = StaffMember.query.get_or_404(staff_id)
     action = request.form.get('action')
     notes = request.form.get('notes', '')
+    previous_status = staff_member.status
     
     if action == 'approve':
         staff_member.status = 3
-        staff_member.admin_notes = notes
         flash('Staff member approved successfully.', 'success')
     elif action == 'reject':
         staff_member.status = -1
-        staff_member.admin_notes = notes
         flash('Staff member rejected.', 'warning')
     elif action == 'screening':
         staff_member.status = 1
-        staff_member.screening_notes = notes
         flash('Staff member moved to screening.', 'info')
+    else:
+        flash('Unknown status action.', 'error')
+        return redirect(url_for('staff_profile', staff_id=staff_id))
     
+    # Appended to the history instead of rewriting the notes columns on every transition
+    record_status_events('staff', [(staff_member.id, previous_status, staff_member.status)], admin_id=current_user.id, notes=notes)
     staff_member.updated_at = datetime.utcnow()
     db.session.commit()
+    invalidate_dashboard_stats()
     
     return redirect(url_for('staff_profile', staff_id=staff_id))
 
 
-@app.route('/admin/crew/export')
+def bulk_update_status(model, entity_type, ids, new_status, notes=''):
+    """Move the given rows to new_status with one UPDATE and one history INSERT; returns how many changed"""
+    # Rows already in the target status are skipped so they get no history entry
+    transitions = db.session.query(model.id, model.status).filter(
+        model.id.in_(ids), model.status != new_status
+    ).with_for_update().all()
+    if not transitions:
+        return 0
+    
+    table = model.__table__
+    db.session.execute(
+        table.update().where(table.c.id.in_([entity_id for entity_id, _ in transitions])).values(
+            status=new_status, updated_at=datetime.utcnow()
+        )
+    )
+    record_status_events(entity_type, [(entity_id, previous_status, new_status) for entity_id, previous_status in transitions],
+                         admin_id=current_user.id, notes=notes)
+    db.session.commit()
+    invalidate_dashboard_stats()
+    
+    return len(transitions)
+
+
+def bulk_status_redirect(endpoint):
+    """Back to the list the bulk action was submitted from, with its filters"""
+    filters = {field: request.form[field] for field in LIST_FILTER_FIELDS if request.form.get(field)}
+    return redirect(url_for(endpoint, **filters))
+
+
+@app.route('/admin/crew/bulk_status', methods=['POST'])
 @login_required
-def export_crew():
-    """Export crew data to CSV"""
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'Name', 'Rank', 'Passport', 'Nationality', 'Email', 'Mobile',
-        'Experience (Years)', 'Availability Date', 'Status', 'Created At'
-    ])
-    
-    # Write crew data
-    crew_members = CrewMember.query.all()
-    for crew in crew_members:
-        writer.writerow([
-            crew.name, crew.rank, crew.passport, crew.nationality, crew.email,
-            crew.mobile_number, crew.years_experience, crew.availability_date,
-            crew.get_status_name(), crew.created_at.strftime('%Y-%m-%d')
-        ])
-    
-    # Create response
-    output.seek(0)
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=crew_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+def bulk_update_crew_status():
+    """Update the status of several crew members at once"""
+    new_status = CREW_STATUS_ACTIONS.get(request.form.get('action'))
+    ids = request.form.getlist('ids', type=int)
     
+    if new_status is None:
+        flash('Unknown status action.', 'error')
+    elif not ids:
+        flash('Select at least one crew member.', 'warning')
+    else:
+        changed = bulk_update_status(CrewMember, 'crew', ids, new_status, request.form.get('notes', ''))
+        flash(f'{changed} crew member(s) moved to {CREW_STATUS_NAMES[new_status]}.', 'success')
+    
+    return bulk_status_redirect('crew_list')
+
+
+@app.route('/admin/staff/bulk_status', methods=['POST'])
+@login_required
+def bulk_update_staff_status():
+    """Update the status of several staff members at once"""
+    new_status = STAFF_STATUS_ACTIONS.get(request.form.get('action'))
+    ids = request.form.getlist('ids', type=int)
+    
+    if new_status is None:
+        flash('Unknown status action.', 'error')
+    elif not ids:
+        flash('Select at least one staff member.', 'warning')
+    else:
+        changed = bulk_update_status(StaffMember, 'staff', ids, new_status, request.form.get('notes', ''))
+        flash(f'{changed} staff member(s) moved to {STAFF_STATUS_NAMES[new_status]}.', 'success')
+    
+    return bulk_status_redirect('staff_list')
+
+
+def export_order(model):
+    """Incremental exports walk the updated_at index; full exports go in id order"""
+    if request.args.get('updated_since'):
+        return model.updated_at, model.id
+    return (model.id,)
+
+
+def csv_export_response(query, columns, basename):
+    """Stream a CSV export, gzip-compressed when requested with ?compress=gzip"""
+    # updated_at is stamped at flush time, so a row flushed just before this export but committed
+    # after it sits below "now". Handing out an earlier watermark re-exports the overlap window
+    # instead of losing those rows; consumers upsert by id, so repeated rows are harmless.
+    watermark = (datetime.utcnow() - timedelta(seconds=app.config['EXPORT_WATERMARK_OVERLAP'])).isoformat()
+    filename = f'{basename}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    chunks = iter_csv(query, columns)
+    
+    if request.args.get('compress') == 'gzip':
+        response = Response(stream_with_context(iter_gzip(chunks)), mimetype='application/gzip')
+        filename += '.gz'
+    else:
+        response = Response(stream_with_context(chunks), mimetype='text/csv')
+    
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Export-Watermark'] = watermark
     return response
 
 
+@app.route('/admin/crew/export')
+@login_required
+def export_crew():
+    """Export crew data to CSV, honouring the crew list filters and an updated_since watermark"""
+    query = filtered_crew_query(request.args).order_by(*export_order(CrewMember))
+    return csv_export_response(query, CREW_EXPORT_COLUMNS, 'crew_export')
+
+
 @app.route('/admin/staff/export')
 @login_required
 def export_staff():
-    """Export staff data to CSV"""
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'Full Name', 'Position', 'Department', 'Email/WhatsApp', 'Mobile',
-        'Location', 'Experience (Years)', 'Availability Date', 'Status', 'Created At'
-    ])
-    
-    # Write staff data
-    staff_members = StaffMember.query.all()
-    for staff in staff_members:
-        writer.writerow([
-            staff.full_name, staff.position_applying, staff.department,
-            staff.email_or_whatsapp, staff.mobile_number, staff.location,
-            staff.years_experience, staff.availability_date,
-            staff.get_status_name(), staff.created_at.strftime('%Y-%m-%d')
-        ])
-    
-    # Create response
-    output.seek(0)
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=staff_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    """Export staff data to CSV, honouring the staff list filters and an updated_since watermark"""
+    query = filtered_staff_query(request.args).order_by(*export_order(StaffMember))
+    return csv_export_response(query, STAFF_EXPORT_COLUMNS, 'staff_export')
+
+
+EXPORT_FILTER_FIELDS = ('status', 'completion', 'search', 'updated_since')
+
+
+export_jobs_recovered = False
+
+
+@app.before_request
+def recover_export_jobs():
+    """Once per worker process, requeue export jobs orphaned by a restart"""
+    global export_jobs_recovered
+    if export_jobs_recovered:
+        return
+    export_jobs_recovered = True
+    requeued = requeue_stale_export_jobs()
+    if requeued:
+        app.logger.info("Requeued stale export jobs: %s", requeued)
+
+
+@app.route('/admin/exports', methods=['POST'])
+@login_required
+def create_export_job():
+    """Queue a background CSV export for the filters currently shown in a list view"""
+    entity = request.form.get('entity')
+    if entity not in ('crew', 'staff'):
+        abort(400)
     
-    return response
+    filters = {field: request.form[field] for field in EXPORT_FILTER_FIELDS if request.form.get(field)}
+    
+    # Build the query once up front so bad filters fail here rather than in the worker
+    (filtered_crew_query if entity == 'crew' else filtered_staff_query)(filters)
+    
+    job = ExportJob(entity=entity, filters=json.dumps(filters), admin_id=current_user.id)
+    db.session.add(job)
+    db.session.commit()
+    submit(run_export_job, job.id)
+    
+    flash('Export started. You can follow its progress on the dashboard.', 'info')
+    return redirect(url_for('admin_dashboard'))
+
+
+@app.route('/admin/exports/<int:job_id>')
+@login_required
+def export_job_status(job_id):
+    """Export job progress for dashboard polling"""
+    job = ExportJob.query.get_or_404(job_id)
+    # A job stuck after its worker died elsewhere is picked up again by whoever is polling it
+    if job.status in ('pending', 'running') and requeue_stale_export_jobs([job.id]):
+        db.session.refresh(job)
+    return jsonify(job.to_dict())
+
+
+@app.route('/admin/exports/<int:job_id>/download')
+@login_required
+def download_export(job_id):
+    """Serve a finished export, with Range support so interrupted downloads can resume"""
+    job = ExportJob.query.get_or_404(job_id)
+    storage = get_storage()
+    # Jobs finished before exports moved into storage recorded a local path and are gone
+    if job.status != 'complete' or not (job.file_path or '').startswith(EXPORT_PREFIX) or not storage.exists(job.file_path):
+        abort(404)
+    
+    # Object storage hands out a short-lived direct URL instead of streaming through a worker
+    storage_url = storage.url(job.file_path)
+    if storage_url:
+        return redirect(storage_url)
+    
+    return send_file(os.path.abspath(storage.path(job.file_path)), mimetype='text/csv', as_attachment=True,
+                     download_name=job.get_download_name(), conditional=True)
+
+
+app.add_template_global(signed_upload_url, 'upload_url')
+
+# Documents, their previews and untouched originals are only ever cached privately
+PRIVATE_UPLOAD_PREFIXES = ('crew_documents/', THUMBNAIL_PREFIX, ORIGINALS_PREFIX)
+
+
+@app.before_request
+def block_legacy_upload_folder():
+    """Never serve leftovers in static/uploads without the signature check in uploaded_file"""
+    if request.path.startswith('/static/uploads/'):
+        abort(404)
 
 
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     """Serve uploaded files"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # Prefix checks below only mean something on the canonical key: "crew/../exports/..." or
+    # "./exports/..." would otherwise slip past them
+    filename = posixpath.normpath(filename)
+    if filename == '.' or filename.startswith(('..', '/')):
+        abort(404)
+    
+    # Export CSVs share the storage but are only ever served to admins by download_export
+    if filename.startswith(EXPORT_PREFIX):
+        abort(404)
+    
+    shareable = False
+    valid_for = None
+    if app.config['SIGNED_UPLOAD_URLS']:
+        # Checked from the URL alone: no session, no database
+        valid_for = verify_upload_signature(filename, request.args.get('expires'), request.args.get('signature'))
+        if valid_for is None:
+            abort(403)
+        # Anyone holding the link may read the file until it expires, so a shared cache may too,
+        # except for documents and the images derived from them (passport scans included)
+        shareable = not filename.startswith(PRIVATE_UPLOAD_PREFIXES)
+    
+    # Object storage hands out a short-lived direct URL instead of streaming through a worker
+    storage_url = get_storage().url(filename)
+    if storage_url:
+        return redirect(storage_url)
+    
+    # Content-addressed keys embed the SHA-256 of the bytes, which makes a free strong ETag
+    digest = content_digest(filename)
+    max_age = app.config['IMMUTABLE_UPLOAD_MAX_AGE'] if digest else None
+    if max_age and valid_for:
+        # Never cached past the link's own expiry
+        max_age = min(max_age, valid_for)
+    
+    if app.config['UPLOAD_OFFLOAD'] == 'x-accel-redirect':
+        response = accel_redirect_response(filename, digest, max_age)
+    else:
+        # Answers If-None-Match / If-Modified-Since and Range requests; with USE_X_SENDFILE
+        # the body is left to the front proxy
+        response = send_from_directory(app.config['UPLOAD_FOLDER'], filename, etag=digest or True, max_age=max_age)
+    
+    if digest:
+        response.cache_control.public = shareable
+        response.cache_control.private = not shareable
+        response.cache_control.immutable = True
+    return response
+
+
+def accel_redirect_response(filename, digest=None, max_age=None):
+    """Empty response asking nginx to stream filename from its internal uploads location"""
+    try:
+        get_storage().path(filename)  # Refuses keys that escape the upload folder
+    except ValueError:
+        abort(404)
+    
+    response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    if digest:
+        response.set_etag(digest)
+        response.cache_control.max_age = max_age
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+    
+    # nginx handles Range and its own validators for the file it serves
+    response.headers['X-Accel-Redirect'] = app.config['UPLOAD_ACCEL_REDIRECT_PREFIX'] + quote(filename)
+    return response
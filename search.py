@@ -0,0 +1,158 @@
+"""Full-text search index over crew members, staff members and document filenames.
+
+SQLite uses an FTS5 table kept in sync by triggers; PostgreSQL uses generated
+tsvector columns with GIN indexes. Both are installed by migrations.py.
+"""
+import re
+
+import sqlalchemy as sa
+
+from app import db
+
+
+# Searchable text per entity: (entity type, table, columns)
+SEARCH_SOURCES = [
+    ('crew', 'crew_members', ['name', 'passport', 'rank']),
+    ('staff', 'staff_members', ['full_name', 'position_applying', 'department']),
+    ('document', 'crew_documents', ['original_filename']),
+]
+
+# Each entity type owns one residue of the FTS rowid, so rows can be replaced by rowid
+ENTITY_CODES = {'crew': 0, 'staff': 1, 'document': 2}
+
+
+def _body_expression(columns, prefix):
+    return " || ' ' || ".join(f"coalesce({prefix}{column}, '')" for column in columns)
+
+
+def install_search_index(connection):
+    """Create the dialect-specific search index and populate it from existing rows"""
+    if connection.dialect.name == 'postgresql':
+        _install_postgresql(connection)
+    elif _sqlite_has_fts5(connection):
+        _install_sqlite(connection)
+
+
+def _sqlite_has_fts5(connection):
+    options = connection.execute(sa.text('PRAGMA compile_options')).scalars().all()
+    return 'ENABLE_FTS5' in options
+
+
+def _install_sqlite(connection):
+    connection.execute(sa.text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "entity_type UNINDEXED, entity_id UNINDEXED, body, tokenize='unicode61')"
+    ))
+
+    for entity_type, table, columns in SEARCH_SOURCES:
+        code = ENTITY_CODES[entity_type]
+        insert_row = (
+            f"INSERT INTO search_index(rowid, entity_type, entity_id, body) "
+            f"VALUES (new.id * 3 + {code}, '{entity_type}', new.id, {_body_expression(columns, 'new.')});"
+        )
+        delete_row = f"DELETE FROM search_index WHERE rowid = old.id * 3 + {code};"
+
+        connection.execute(sa.text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} "
+            f"BEGIN {insert_row} END"
+        ))
+        connection.execute(sa.text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {', '.join(columns)} ON {table} "
+            f"BEGIN {delete_row} {insert_row} END"
+        ))
+        connection.execute(sa.text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} "
+            f"BEGIN {delete_row} END"
+        ))
+        connection.execute(sa.text(
+            f"INSERT OR REPLACE INTO search_index(rowid, entity_type, entity_id, body) "
+            f"SELECT id * 3 + {code}, '{entity_type}', id, {_body_expression(columns, '')} FROM {table}"
+        ))
+
+
+def _install_postgresql(connection):
+    for entity_type, table, columns in SEARCH_SOURCES:
+        connection.execute(sa.text(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('simple', {_body_expression(columns, '')})) STORED"
+        ))
+        connection.execute(sa.text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"
+        ))
+
+
+_backend_cache = {}
+
+
+def search_backend():
+    """Return the active search backend name, or None when no index is installed"""
+    engine = db.engine
+    if engine.dialect.name == 'postgresql':
+        return 'postgresql'
+    if engine.url not in _backend_cache:
+        # Probe once per database; the FTS table only exists once migrations ran on a capable SQLite
+        exists = db.session.execute(sa.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+        )).first()
+        _backend_cache[engine.url] = 'sqlite' if exists else None
+    return _backend_cache[engine.url]
+
+
+def _search_terms(term):
+    return re.findall(r'[^\W_]+', (term or '').lower())
+
+
+def build_match_query(term, backend):
+    """Turn free text into a prefix-matching query for the backend, or None if nothing to match"""
+    terms = _search_terms(term)
+    if not terms:
+        return None
+    if backend == 'postgresql':
+        return ' & '.join(f'{word}:*' for word in terms)
+    return ' '.join(f'"{word}"*' for word in terms)
+
+
+def matching_ids(entity_type, term):
+    """Return a subquery of entity ids matching term, or None when the index can't be used"""
+    backend = search_backend()
+    match_query = build_match_query(term, backend)
+    if not backend or not match_query:
+        return None
+
+    if backend == 'postgresql':
+        table = next(source[1] for source in SEARCH_SOURCES if source[0] == entity_type)
+        statement = sa.text(
+            f"SELECT id FROM {table} WHERE search_vector @@ to_tsquery('simple', :match_query)"
+        )
+    else:
+        statement = sa.text(
+            "SELECT entity_id AS id FROM search_index "
+            "WHERE search_index MATCH :match_query AND entity_type = :entity_type"
+        ).bindparams(entity_type=entity_type)
+
+    return statement.bindparams(match_query=match_query).columns(id=sa.Integer).subquery()
+
+
+def search_all(term, limit=50):
+    """Return [(entity_type, entity_id, rank)] across crew, staff and documents, best match first"""
+    backend = search_backend()
+    match_query = build_match_query(term, backend)
+    if not backend or not match_query:
+        return []
+
+    if backend == 'postgresql':
+        statement = sa.text(' UNION ALL '.join(
+            f"SELECT '{entity_type}' AS entity_type, id AS entity_id, "
+            f"ts_rank(search_vector, to_tsquery('simple', :match_query)) AS rank "
+            f"FROM {table} WHERE search_vector @@ to_tsquery('simple', :match_query)"
+            for entity_type, table, _ in SEARCH_SOURCES
+        ) + ' ORDER BY rank DESC LIMIT :limit')
+    else:
+        # bm25() is lower-is-better; negate so both backends sort the same way
+        statement = sa.text(
+            "SELECT entity_type, entity_id, -bm25(search_index) AS rank FROM search_index "
+            "WHERE search_index MATCH :match_query ORDER BY rank DESC LIMIT :limit"
+        )
+
+    rows = db.session.execute(statement, {'match_query': match_query, 'limit': limit})
+    return [(row.entity_type, int(row.entity_id), row.rank) for row in rows]
@@ -0,0 +1,73 @@
+"""Upload spooling that records size and SHA-256 while the request body is parsed.
+
+Werkzeug spools each multipart file part to a temporary file before the view runs.
+SpooledUploadRequest spools large parts into UPLOAD_TEMP_FOLDER instead and hashes
+them as they are written, so saving an upload can hard-link the spooled file into
+place rather than copying and re-reading every byte.
+"""
+import hashlib
+import os
+import uuid
+from io import BytesIO
+
+from flask import Request, current_app
+
+
+# Parts up to this size stay in memory, matching Werkzeug's own threshold
+MEMORY_SPOOL_SIZE = 500 * 1024
+
+
+class HashedSpool:
+    """Writable upload buffer that tracks the size and SHA-256 of everything written to it"""
+
+    def __init__(self, buffer, path=None):
+        self._buffer = buffer
+        self._digest = hashlib.sha256()
+        self.path = path
+        self.size = 0
+
+    @classmethod
+    def on_disk(cls, folder):
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'spool-{uuid.uuid4().hex}')
+        # Created with the default mode (not tempfile's 0600) so a linked copy stays readable
+        return cls(open(path, 'x+b'), path)
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def write(self, data):
+        self._digest.update(data)
+        self.size += len(data)
+        return self._buffer.write(data)
+
+    def close(self):
+        self._buffer.close()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __getattr__(self, name):
+        # read, seek, tell, readline, ... go straight to the underlying buffer
+        return getattr(self._buffer, name)
+
+    def __iter__(self):
+        return iter(self._buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SpooledUploadRequest(Request):
+    """Request whose file parts are hashed while parsed and spooled next to the upload folder"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= MEMORY_SPOOL_SIZE:
+            return HashedSpool(BytesIO())
+        return HashedSpool.on_disk(current_app.config['UPLOAD_TEMP_FOLDER'])
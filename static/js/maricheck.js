@@ -18,10 +18,12 @@
         initializeAlerts();
         initializeFormValidation();
         initializeFileUploads();
+        initializeChunkedUploads();
         initializeTooltips();
         initializeLoadingStates();
         initializeCopyToClipboard();
         initializeFormAnimations();
+        initializeBulkSelection();
     }
 
     /**
@@ -186,13 +188,15 @@
     function handleFileUpload(input) {
         const files = Array.from(input.files);
         const allowedTypes = input.getAttribute('accept');
-        const maxSize = 16 * 1024 * 1024; // 16MB
+        // Without chunked uploads the form falls back to one plain POST, capped by MAX_CONTENT_LENGTH
+        const limit = supportsChunkedUploads() ? input.dataset.maxSize : input.dataset.fallbackMaxSize;
+        const maxSize = parseInt(limit, 10) || 16 * 1024 * 1024;
         
         // Validate files
         const validFiles = files.filter(function(file) {
             // Size validation
             if (file.size > maxSize) {
-                showFileError(input, `File "${file.name}" is too large. Maximum size is 16MB.`);
+                showFileError(input, `File "${file.name}" is too large. Maximum size is ${formatFileSize(maxSize)}.`);
                 return false;
             }
             
@@ -259,6 +263,189 @@
         messages.forEach(msg => msg.remove());
     }
 
+    /**
+     * Whether this browser can send files through the resumable chunked upload endpoint
+     */
+    function supportsChunkedUploads() {
+        if (!document.querySelector('form[data-chunked-upload-url]')) return false;
+        if (!window.fetch || !window.Blob || !Blob.prototype.slice) return false;
+        // The server requires a checksum on the final chunk, which needs Web Crypto (HTTPS)
+        return Boolean(window.crypto && window.crypto.subtle);
+    }
+
+    /**
+     * Resumable chunked uploads for forms with data-chunked-upload-url
+     */
+    function initializeChunkedUploads() {
+        if (!supportsChunkedUploads()) return;
+        const form = document.querySelector('form[data-chunked-upload-url]');
+        
+        form.addEventListener('submit', function(event) {
+            const uploads = [];
+            form.querySelectorAll('input[type="file"]').forEach(function(input) {
+                Array.from(input.files).forEach(function(file) {
+                    uploads.push({ documentType: input.name, file: file });
+                });
+            });
+            
+            // Nothing selected: let the regular POST report it
+            if (uploads.length === 0) return;
+            event.preventDefault();
+            
+            const submitBtn = form.querySelector('[type="submit"]');
+            const totalBytes = uploads.reduce(function(sum, upload) { return sum + upload.file.size; }, 0);
+            let finishedBytes = 0;
+            
+            uploads.reduce(function(previous, upload) {
+                return previous.then(function() {
+                    return uploadFileInChunks(form.dataset.chunkedUploadUrl, upload, function(offset) {
+                        const percent = Math.floor(((finishedBytes + offset) / totalBytes) * 100);
+                        submitBtn.value = `Uploading... ${percent}%`;
+                    }).then(function() {
+                        finishedBytes += upload.file.size;
+                    });
+                });
+            }, Promise.resolve()).then(function() {
+                window.location.reload();
+            }).catch(function(error) {
+                showNotification(`Upload interrupted: ${error.message}. Submit again to resume.`, 'danger');
+                submitBtn.disabled = false;
+                submitBtn.value = 'Upload Documents';
+            });
+        });
+    }
+    
+    /**
+     * Upload one file with the tus offset protocol, resuming a previous attempt if one exists
+     */
+    function uploadFileInChunks(createUrl, upload, onProgress) {
+        const file = upload.file;
+        const storageKey = ['maricheck-upload', createUrl, upload.documentType, file.name, file.size, file.lastModified].join(':');
+        let location = localStorage.getItem(storageKey);
+        let chunkSize = 1024 * 1024;
+        
+        const resume = location
+            ? requestWithRetry(location, { method: 'HEAD', headers: { 'Tus-Resumable': '1.0.0' } })
+                .then(function(response) { return parseInt(response.headers.get('Upload-Offset'), 10); })
+                .catch(function() { location = null; return null; })
+            : Promise.resolve(null);
+        
+        return resume.then(function(offset) {
+            if (location && offset !== null) return offset;
+            
+            return requestWithRetry(createUrl, {
+                method: 'POST',
+                headers: {
+                    'Tus-Resumable': '1.0.0',
+                    'Upload-Length': String(file.size),
+                    'Upload-Metadata': [
+                        'filename ' + encodeMetadata(file.name),
+                        'document_type ' + encodeMetadata(upload.documentType),
+                        'content_type ' + encodeMetadata(file.type || 'application/octet-stream')
+                    ].join(',')
+                }
+            }).then(function(response) {
+                return response.json();
+            }).then(function(created) {
+                location = created.location;
+                chunkSize = created.chunk_size || chunkSize;
+                localStorage.setItem(storageKey, location);
+                return 0;
+            });
+        }).then(function sendFrom(offset) {
+            onProgress(offset);
+            if (offset >= file.size) {
+                localStorage.removeItem(storageKey);
+                return;
+            }
+            return sendChunk(location, file.slice(offset, offset + chunkSize), offset, file.size).then(sendFrom);
+        });
+    }
+    
+    /**
+     * Send one chunk, retrying it on its own until the server acknowledges a new offset
+     */
+    function sendChunk(location, chunk, offset, fileSize, attempt = 0) {
+        return chunkChecksum(chunk).then(function(checksum) {
+            const headers = {
+                'Tus-Resumable': '1.0.0',
+                'Upload-Offset': String(offset),
+                'Content-Type': 'application/offset+octet-stream'
+            };
+            if (checksum) headers['Upload-Checksum'] = 'sha256 ' + checksum;
+            
+            return fetch(location, { method: 'PATCH', headers: headers, body: chunk });
+        }).then(function(response) {
+            if (response.ok) {
+                return parseInt(response.headers.get('Upload-Offset'), 10);
+            }
+            if (response.status === 409) {
+                // An earlier attempt landed after all; continue from the server's offset
+                return fetch(location, { method: 'HEAD' }).then(function(head) {
+                    return parseInt(head.headers.get('Upload-Offset'), 10);
+                });
+            }
+            if (response.status === 404 && attempt > 0 && offset + chunk.size === fileSize) {
+                // The final chunk was stored before its response was lost
+                return fileSize;
+            }
+            if (response.status >= 500 || response.status === 460) {
+                throw new Error(`server responded ${response.status}`);
+            }
+            return response.json().then(function(body) {
+                const error = new Error(body.error || `server responded ${response.status}`);
+                error.permanent = true;
+                throw error;
+            });
+        }).catch(function(error) {
+            if (error.permanent || attempt >= 5) throw error;
+            return delay(Math.min(1000 * Math.pow(2, attempt), 30000)).then(function() {
+                return sendChunk(location, chunk, offset, fileSize, attempt + 1);
+            });
+        });
+    }
+    
+    /**
+     * fetch() that retries network failures and server errors with backoff
+     */
+    function requestWithRetry(url, options, attempt = 0) {
+        return fetch(url, options).then(function(response) {
+            if (response.status >= 500) throw new Error(`server responded ${response.status}`);
+            if (!response.ok) {
+                const error = new Error(`server responded ${response.status}`);
+                error.permanent = true;
+                throw error;
+            }
+            return response;
+        }).catch(function(error) {
+            if (error.permanent || attempt >= 5) throw error;
+            return delay(Math.min(1000 * Math.pow(2, attempt), 30000)).then(function() {
+                return requestWithRetry(url, options, attempt + 1);
+            });
+        });
+    }
+    
+    /**
+     * Base64 SHA-256 of a chunk, or null where Web Crypto is unavailable (non-HTTPS)
+     */
+    function chunkChecksum(chunk) {
+        if (!window.crypto || !window.crypto.subtle) return Promise.resolve(null);
+        
+        return chunk.arrayBuffer().then(function(buffer) {
+            return window.crypto.subtle.digest('SHA-256', buffer);
+        }).then(function(digest) {
+            return btoa(String.fromCharCode.apply(null, new Uint8Array(digest)));
+        });
+    }
+    
+    function encodeMetadata(value) {
+        return btoa(unescape(encodeURIComponent(value)));
+    }
+    
+    function delay(ms) {
+        return new Promise(function(resolve) { setTimeout(resolve, ms); });
+    }
+
     /**
      * Initialize Bootstrap tooltips
      */
@@ -283,6 +470,43 @@
         });
     }
 
+    /**
+     * Select-all checkbox and selection count for bulk action forms
+     */
+    function initializeBulkSelection() {
+        document.querySelectorAll('[data-bulk-form]').forEach(function(form) {
+            const checkboxes = document.querySelectorAll(`input[name="ids"][form="${form.id}"]`);
+            const selectAll = document.querySelector(`[data-bulk-select-all="${form.id}"]`);
+            const count = form.querySelector('[data-bulk-count]');
+            const submit = form.querySelector('button[type="submit"]');
+            
+            function updateSelection() {
+                const selected = Array.from(checkboxes).filter(function(checkbox) {
+                    return checkbox.checked;
+                }).length;
+                if (count) count.textContent = selected;
+                if (submit) submit.disabled = selected === 0;
+                if (selectAll) {
+                    selectAll.checked = selected > 0 && selected === checkboxes.length;
+                    selectAll.indeterminate = selected > 0 && selected < checkboxes.length;
+                }
+            }
+            
+            if (selectAll) {
+                selectAll.addEventListener('change', function() {
+                    checkboxes.forEach(function(checkbox) {
+                        checkbox.checked = selectAll.checked;
+                    });
+                    updateSelection();
+                });
+            }
+            checkboxes.forEach(function(checkbox) {
+                checkbox.addEventListener('change', updateSelection);
+            });
+            updateSelection();
+        });
+    }
+
     /**
      * Add loading state to button
      */
@@ -0,0 +1,44 @@
+"""Cached status counts for the admin dashboard"""
+import threading
+import time
+
+from flask import current_app
+
+from app import db
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def status_counts(model):
+    """Count rows per status for a model in a single GROUP BY query"""
+    rows = db.session.query(model.status, db.func.count(model.id)).group_by(model.status)
+    return {status: count for status, count in rows}
+
+
+def get_dashboard_stats():
+    """Return per-status counts for crew and staff, cached for DASHBOARD_STATS_TTL seconds"""
+    from models import CrewMember, StaffMember  # Import here to avoid circular imports
+
+    ttl = current_app.config.get('DASHBOARD_STATS_TTL', 60)
+    with _lock:
+        cached = _cache.get('stats')
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+    stats = {
+        'crew': status_counts(CrewMember),
+        'staff': status_counts(StaffMember),
+    }
+
+    with _lock:
+        _cache['stats'] = (time.monotonic(), stats)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    """Drop cached counts after a registration or status change in this process"""
+    # Other worker processes keep their copy until the TTL expires
+    with _lock:
+        _cache.pop('stats', None)
@@ -0,0 +1,288 @@
+"""Storage backends for uploaded files.
+
+Files are addressed by a key relative to the upload root (the value stored in the
+database, e.g. ``crew_documents/blobs/ab/cd/<digest>.pdf``). LocalStorage keeps them
+under UPLOAD_FOLDER; S3Storage keeps them in an S3-compatible bucket (AWS, MinIO)
+so every autoscaled instance sees the same files.
+"""
+import os
+import shutil
+import uuid
+
+from flask import current_app
+from werkzeug.security import safe_join
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # Only needed when STORAGE_BACKEND=s3
+    boto3 = None
+    ClientError = None
+
+
+class LocalStorage:
+    """Files on the local filesystem under a root folder"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        """Absolute local path for a key, refusing keys that escape the root"""
+        path = safe_join(self.root, key)
+        if path is None:
+            raise ValueError(f'Invalid storage key: {key}')
+        return path
+
+    def save_file(self, key, source_path, keep_source=False, exclusive=False):
+        """Move a finished local file into place under key, or hard-link it when keep_source is set
+
+        With exclusive an existing file at key is left untouched. Returns whether this call
+        created the file, so failure cleanup only removes what it wrote.
+        """
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if exclusive:
+            temp = self._temp_path(target)
+            self._place(source_path, temp, keep_source)
+            return self._publish(temp, target)
+        self._place(source_path, target, keep_source)
+        return True
+
+    def save_stream(self, key, stream, exclusive=False):
+        """Write a readable binary stream to key; see save_file for exclusive"""
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        destination = self._temp_path(target) if exclusive else target
+        with open(destination, 'wb') as handle:
+            shutil.copyfileobj(stream, handle, 64 * 1024)
+        return self._publish(destination, target) if exclusive else True
+
+    @staticmethod
+    def _temp_path(target):
+        # Dot-prefixed so the orphan sweep never mistakes a write in progress for an upload
+        directory, name = os.path.split(target)
+        return os.path.join(directory, f'.{name}.{uuid.uuid4().hex}.tmp')
+
+    @staticmethod
+    def _place(source_path, target, keep_source):
+        if not keep_source:
+            shutil.move(source_path, target)  # A rename when both sides share a filesystem
+            return
+        try:
+            os.link(source_path, target)
+        except OSError:
+            # Different filesystem, no hard-link support, or a stale file already at target
+            shutil.copyfile(source_path, target)
+
+    @staticmethod
+    def _publish(temp, target):
+        """Link a finished temp file to target unless something is already there"""
+        try:
+            os.link(temp, target)  # Atomic, and fails instead of replacing an existing file
+            return True
+        except FileExistsError:
+            return False
+        except OSError:
+            # No hard links on this filesystem; fall back to a check-then-rename
+            if os.path.exists(target):
+                return False
+            os.replace(temp, target)
+            return True
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+    def move(self, key, new_key):
+        target = self.path(new_key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(self.path(key), target)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_keys(self, prefix=''):
+        """Yield every stored key under prefix, walking directories lazily"""
+        for key, _, _ in self.iter_files(prefix):
+            yield key
+
+    def iter_files(self, prefix=''):
+        """Yield (key, size, modified timestamp) for every stored file under prefix"""
+        start = self.path(prefix) if prefix else self.root
+        for directory, _, filenames in os.walk(start):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:  # Removed while we were walking
+                    continue
+                yield os.path.relpath(path, self.root).replace(os.sep, '/'), stat.st_size, stat.st_mtime
+
+    def url(self, key, expires_in=None):
+        """Local files are served by the uploaded_file route"""
+        return None
+
+
+class S3Storage:
+    """Files in an S3-compatible bucket, downloaded through presigned URLs"""
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region_name=None,
+                 access_key_id=None, secret_access_key=None, url_expires_in=300):
+        if boto3 is None:
+            raise RuntimeError('STORAGE_BACKEND=s3 requires boto3 (pip install boto3)')
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix else ''
+        self.url_expires_in = url_expires_in
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key
+        )
+
+    def _object_key(self, key):
+        return self.prefix + key
+
+    def save_file(self, key, source_path, keep_source=False, exclusive=False):
+        """Upload a finished local file to key, then remove the local copy unless keep_source is set
+
+        With exclusive the upload is a conditional PUT that leaves an existing object alone.
+        Returns whether this call created the object.
+        """
+        if exclusive:
+            with open(source_path, 'rb') as handle:
+                created = self._put_if_absent(key, handle)
+        else:
+            self.client.upload_file(source_path, self.bucket, self._object_key(key))
+            created = True
+        if not keep_source:
+            os.remove(source_path)
+        return created
+
+    def save_stream(self, key, stream, exclusive=False):
+        """Upload a readable binary stream to key; see save_file for exclusive"""
+        if exclusive:
+            return self._put_if_absent(key, stream)
+        self.client.upload_fileobj(stream, self.bucket, self._object_key(key))
+        return True
+
+    def _put_if_absent(self, key, body):
+        try:
+            self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=body, IfNoneMatch='*')
+        except ClientError as error:
+            if error.response.get('Error', {}).get('Code') in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                return False
+            raise
+        return True
+
+    def move(self, key, new_key):
+        self.client.copy(
+            {'Bucket': self.bucket, 'Key': self._object_key(key)}, self.bucket, self._object_key(new_key)
+        )
+        self.delete(key)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as error:
+            if error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def size(self, key):
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head['ContentLength']
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def iter_keys(self, prefix=''):
+        """Yield every stored key under prefix, one listing page at a time"""
+        for key, _, _ in self.iter_files(prefix):
+            yield key
+
+    def iter_files(self, prefix=''):
+        """Yield (key, size, modified timestamp) for every stored object under prefix"""
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix)):
+            for item in page.get('Contents', []):
+                yield item['Key'][len(self.prefix):], item['Size'], item['LastModified'].timestamp()
+
+    def url(self, key, expires_in=None):
+        """Presigned GET URL so the download bypasses the Flask workers"""
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self._object_key(key)},
+            ExpiresIn=expires_in or self.url_expires_in
+        )
+
+
+def move_legacy_uploads(source, target):
+    """Move files from the old static/uploads folder into target, keeping their keys; returns the count"""
+    moved = 0
+    for directory, _, filenames in os.walk(source, topdown=False):
+        for filename in filenames:
+            if filename.startswith('.'):
+                continue
+            path = os.path.join(directory, filename)
+            destination = os.path.join(target, os.path.relpath(path, source))
+            if os.path.exists(destination):
+                continue
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            try:
+                shutil.move(path, destination)
+            except FileNotFoundError:  # Another worker moved it first
+                continue
+            moved += 1
+        if directory != source:
+            try:
+                os.rmdir(directory)
+            except OSError:  # Not empty
+                pass
+    return moved
+
+
+def create_storage(config):
+    """Build the storage backend selected by STORAGE_BACKEND"""
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend == 'local':
+        return LocalStorage(config['UPLOAD_FOLDER'])
+    if backend == 's3':
+        return S3Storage(
+            bucket=config['S3_BUCKET'],
+            prefix=config.get('S3_PREFIX', ''),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region_name=config.get('S3_REGION'),
+            access_key_id=config.get('S3_ACCESS_KEY_ID'),
+            secret_access_key=config.get('S3_SECRET_ACCESS_KEY'),
+            url_expires_in=config.get('S3_PRESIGNED_URL_TTL', 300)
+        )
+    raise RuntimeError(f'Unknown STORAGE_BACKEND: {backend}')
+
+
+def get_storage():
+    """Storage backend for the current app, created on first use"""
+    storage = current_app.extensions.get('maricheck_storage')
+    if storage is None:
+        storage = current_app.extensions['maricheck_storage'] = create_storage(current_app.config)
+    return storage
@@ -0,0 +1,35 @@
+"""In-process background workers for jobs that must not run inside a request"""
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=app.config.get('BACKGROUND_WORKERS', 2),
+    thread_name_prefix='maricheck-worker'
+)
+
+# Previews get their own pool so a burst of uploads never queues behind long export jobs
+_preview_executor = ThreadPoolExecutor(
+    max_workers=app.config.get('PREVIEW_WORKERS', 2),
+    thread_name_prefix='maricheck-preview'
+)
+
+
+def _run_in_app_context(func, args, kwargs):
+    with app.app_context():
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            app.logger.exception(f'Background task {func.__name__} failed')
+            raise
+
+
+def submit(func, *args, **kwargs):
+    """Run func(*args, **kwargs) on the background worker inside an application context"""
+    return _executor.submit(_run_in_app_context, func, args, kwargs)
+
+
+def submit_preview(func, *args, **kwargs):
+    """Like submit, on the pool reserved for document previews"""
+    return _preview_executor.submit(_run_in_app_context, func, args, kwargs)
@@ -0,0 +1,87 @@
+"""Find and reclaim uploaded files that no database row points at.
+
+The storage tree is walked as a stream and checked in batches: one set lookup per
+table per batch, never a query per file. Files younger than the grace period are
+skipped so uploads whose rows are not committed yet are left alone. Only the folders
+the app writes uploads into are walked, and dotfiles such as .gitkeep are never touched.
+"""
+import time
+from itertools import chain, islice
+
+from imaging import ORIGINALS_PREFIX, normalized_key_for_original
+from storage import get_storage
+
+# Folders save_uploaded_file and the document pipeline write into; crew_documents/ holds the
+# blobs and thumbnails as well as unsharded legacy documents
+UPLOAD_PREFIXES = ('crew/', 'staff/', 'crew_documents/', ORIGINALS_PREFIX)
+
+
+def _referenced_keys(keys):
+    """The subset of keys that some row still refers to"""
+    from models import db, CrewDocument, CrewMember, StaffMember, StoredBlob, LEGACY_FILE_COLUMNS  # Import here to avoid circular imports
+
+    # A kept original lives or dies with the file it was normalized into: its own key minus the
+    # prefix for per-upload files, its parent for digest-named originals of shared blobs
+    owners = {key: (key.removeprefix(ORIGINALS_PREFIX), normalized_key_for_original(key))
+              if key.startswith(ORIGINALS_PREFIX) else (key,) for key in keys}
+    lookup = {owner for candidates in owners.values() for owner in candidates}
+    sources = [
+        [CrewDocument.filename, CrewDocument.thumbnail_filename],
+        [getattr(CrewMember, column) for column in LEGACY_FILE_COLUMNS],
+        [StaffMember.resume_file, StaffMember.photo_file],
+    ]
+
+    referenced = set()
+    for columns in sources:
+        rows = db.session.query(*columns).filter(db.or_(*(column.in_(lookup) for column in columns)))
+        for row in rows:
+            referenced.update(value for value in row if value in lookup)
+
+    # Blob rows still counting references keep their file even if the documents are mid-write
+    referenced.update(filename for filename, in db.session.query(StoredBlob.filename).filter(
+        StoredBlob.filename.in_(lookup), StoredBlob.ref_count > 0
+    ))
+    return {key for key, candidates in owners.items() if referenced.intersection(candidates)}
+
+
+def iter_orphan_uploads(min_age=24 * 3600, batch_size=500, pause=0.0):
+    """Yield (key, size) for every stored file no row refers to
+
+    Sleeps pause seconds between batches so a run during business hours leaves
+    the disk and database to the web workers.
+    """
+    cutoff = time.time() - min_age
+    storage = get_storage()
+    files = (
+        entry for entry in chain.from_iterable(storage.iter_files(prefix) for prefix in UPLOAD_PREFIXES)
+        if entry[2] < cutoff and not any(part.startswith('.') for part in entry[0].split('/'))
+    )
+
+    while True:
+        batch = list(islice(files, batch_size))
+        if not batch:
+            break
+        referenced = _referenced_keys([key for key, _, _ in batch])
+        for key, size, _ in batch:
+            if key not in referenced:
+                yield key, size
+        if pause:
+            time.sleep(pause)
+
+
+def reclaim_orphan_upload(key):
+    """Delete an orphaned file, dropping its unreferenced blob row first; False when the blob came back into use"""
+    from models import db, StoredBlob  # Import here to avoid circular imports
+
+    blob_table = StoredBlob.__table__
+    if db.session.query(StoredBlob.sha256).filter(StoredBlob.filename == key).first():
+        # Only an unreferenced row goes, so a concurrent upload that just reused it keeps its file
+        deleted = db.session.execute(
+            blob_table.delete().where(blob_table.c.filename == key, blob_table.c.ref_count <= 0)
+        ).rowcount
+        db.session.commit()
+        if not deleted:
+            return False
+
+    get_storage().delete(key)
+    return True
@@ -0,0 +1,198 @@
+"""Resumable chunked uploads for crew documents.
+
+Follows the tus protocol's offset model: the client creates an upload with its total
+length, then PATCHes chunks at the current offset, each with a SHA-256 checksum that is
+optional except on the chunk completing the file. Partial uploads live outside the public
+upload folder until complete; abandoned ones are swept by expire_stale_uploads.
+"""
+import base64
+import binascii
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+
+from models import document_category_for_type, iter_document_types
+
+
+# Allowed extensions per document type, mirroring CrewProfileDocumentForm
+ALLOWED_EXTENSIONS = {
+    'photo': {'jpg', 'jpeg', 'png'},
+    'resume': {'pdf', 'doc', 'docx'},
+}
+DEFAULT_ALLOWED_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png'}
+
+DOCUMENT_TYPES = {doc['type'] for doc in iter_document_types()}
+
+
+class ChunkedUploadError(Exception):
+    """Upload request the client must correct, carrying the HTTP status to answer with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _upload_folder():
+    folder = current_app.config['CHUNKED_UPLOAD_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _paths(upload_id):
+    # upload ids are generated by us as hex; reject anything else before touching the filesystem
+    if not upload_id or not all(char in '0123456789abcdef' for char in upload_id):
+        raise ChunkedUploadError('Unknown upload', 404)
+    base = os.path.join(_upload_folder(), upload_id)
+    return base + '.json', base + '.part'
+
+
+def create_upload(crew_id, document_type, filename, length, content_type=None):
+    """Start a chunked upload and return its state"""
+    if document_type not in DOCUMENT_TYPES:
+        raise ChunkedUploadError('Unknown document type')
+
+    filename = filename or ''
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in ALLOWED_EXTENSIONS.get(document_type, DEFAULT_ALLOWED_EXTENSIONS):
+        raise ChunkedUploadError('File type not allowed for this document')
+
+    if not isinstance(length, int) or length <= 0:
+        raise ChunkedUploadError('Upload-Length must be a positive integer')
+    if length > current_app.config['MAX_CHUNKED_UPLOAD_SIZE']:
+        raise ChunkedUploadError('File is too large', 413)
+
+    state = {
+        'upload_id': uuid.uuid4().hex,
+        'crew_id': crew_id,
+        'document_type': document_type,
+        'document_category': document_category_for_type(document_type),
+        'filename': filename,
+        'content_type': content_type or 'application/octet-stream',
+        'length': length,
+    }
+    meta_path, part_path = _paths(state['upload_id'])
+    open(part_path, 'wb').close()
+    with open(meta_path, 'w') as handle:
+        json.dump(state, handle)
+
+    state['offset'] = 0
+    return state
+
+
+def load_upload(upload_id, crew_id):
+    """Load an upload's state, including its current offset"""
+    meta_path, part_path = _paths(upload_id)
+    try:
+        with open(meta_path) as handle:
+            state = json.load(handle)
+    except FileNotFoundError:
+        raise ChunkedUploadError('Unknown upload', 404)
+
+    if state['crew_id'] != crew_id:
+        raise ChunkedUploadError('Unknown upload', 404)
+
+    state['offset'] = os.path.getsize(part_path)
+    return state
+
+
+def _verify_checksum(data, checksum_header):
+    """Check a tus-style 'sha256 <base64 digest>' header against the chunk"""
+    if not checksum_header:
+        return
+    algorithm, _, encoded = checksum_header.partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise ChunkedUploadError('Unsupported checksum algorithm')
+    try:
+        expected = base64.b64decode(encoded, validate=True)
+    except (ValueError, binascii.Error):
+        raise ChunkedUploadError('Malformed Upload-Checksum header')
+    if hashlib.sha256(data).digest() != expected:
+        # 460 is the tus "Checksum Mismatch" status; the client resends the chunk
+        raise ChunkedUploadError('Checksum mismatch', 460)
+
+
+def append_chunk(state, offset, data, checksum_header=None):
+    """Append a chunk at offset and return the new offset"""
+    _verify_checksum(data, checksum_header)
+    _, part_path = _paths(state['upload_id'])
+
+    with open(part_path, 'ab') as handle:
+        # Serialize concurrent PATCHes for the same upload
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        current_offset = os.fstat(handle.fileno()).st_size
+        if offset != current_offset:
+            raise ChunkedUploadError('Upload-Offset does not match', 409)
+        if current_offset + len(data) > state['length']:
+            raise ChunkedUploadError('Chunk exceeds declared Upload-Length', 413)
+        if current_offset + len(data) == state['length'] and not checksum_header:
+            # The last chunk is what turns the partial file into a stored document
+            raise ChunkedUploadError('Upload-Checksum is required on the final chunk')
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+        state['offset'] = current_offset + len(data)
+
+    return state['offset']
+
+
+def finish_upload(state):
+    """Hand a fully received upload to save_crew_document and clean up its partial files"""
+    from utils import save_crew_document  # Import here to avoid circular imports
+
+    meta_path, part_path = _paths(state['upload_id'])
+    with open(part_path, 'rb') as handle:
+        document = save_crew_document(
+            FileStorage(stream=handle, filename=state['filename'], content_type=state['content_type']),
+            state['crew_id'],
+            state['document_type'],
+            state['document_category']
+        )
+
+    os.remove(part_path)
+    os.remove(meta_path)
+    return document
+
+
+def iter_stale_uploads(max_age):
+    """Yield (upload_id, partial size) for uploads not written to in max_age seconds"""
+    folder = current_app.config['CHUNKED_UPLOAD_FOLDER']
+    if not os.path.isdir(folder):
+        return
+    cutoff = time.time() - max_age
+    for entry in os.scandir(folder):
+        upload_id, extension = os.path.splitext(entry.name)
+        if extension != '.json':
+            continue
+        # Every appended chunk touches the .part file, so its mtime is the last activity
+        _, part_path = _paths(upload_id)
+        try:
+            stat = os.stat(part_path)
+        except FileNotFoundError:
+            stat = entry.stat()
+        if stat.st_mtime < cutoff:
+            yield upload_id, stat.st_size
+
+
+def discard_upload(upload_id):
+    """Remove an upload's partial file and state"""
+    for path in _paths(upload_id):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def expire_stale_uploads(max_age):
+    """Discard abandoned partial uploads; returns (count, bytes) removed"""
+    count = size = 0
+    for upload_id, partial_size in list(iter_stale_uploads(max_age)):
+        discard_upload(upload_id)
+        count += 1
+        size += partial_size
+    return count, size
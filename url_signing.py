@@ -0,0 +1,49 @@
+"""HMAC-signed, expiring links to uploaded files.
+
+A link carries its expiry and an HMAC of (filename, expiry) keyed from SECRET_KEY, so
+/uploads can check access with a hash and a clock read instead of a session or a
+database query. Expiries are rounded up to UPLOAD_URL_BUCKET seconds: every page
+rendered within one bucket produces the same URL, which lets browsers and shared
+caches reuse a response until the link expires.
+"""
+import hashlib
+import hmac
+import time
+
+from flask import current_app, url_for
+
+
+def _upload_signature(filename, expires):
+    key = hashlib.sha256(b'maricheck-upload-url:' + current_app.secret_key.encode('utf-8')).digest()
+    message = f'{filename}\n{expires}'.encode('utf-8')
+    return hmac.new(key, message, hashlib.sha256).hexdigest()[:32]
+
+
+def upload_url_expiry(now=None):
+    """Expiry timestamp for a link issued now, at least UPLOAD_URL_TTL seconds away"""
+    config = current_app.config
+    now = int(now if now is not None else time.time())
+    bucket = config['UPLOAD_URL_BUCKET']
+    return -(-(now + config['UPLOAD_URL_TTL']) // bucket) * bucket
+
+
+def signed_upload_url(filename, **kwargs):
+    """URL for an uploaded file, signed when SIGNED_UPLOAD_URLS is on"""
+    if not current_app.config['SIGNED_UPLOAD_URLS']:
+        return url_for('uploaded_file', filename=filename, **kwargs)
+    expires = upload_url_expiry()
+    return url_for('uploaded_file', filename=filename, expires=expires,
+                   signature=_upload_signature(filename, expires), **kwargs)
+
+
+def verify_upload_signature(filename, expires, signature):
+    """Seconds the link stays valid, or None when it is forged, malformed or expired"""
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return None
+    # Compared as bytes: compare_digest raises TypeError on non-ASCII str
+    if not signature or not hmac.compare_digest(signature.encode('utf-8'), _upload_signature(filename, expires).encode('utf-8')):
+        return None
+    remaining = expires - int(time.time())
+    return remaining if remaining > 0 else None
@@ -1,7 +1,21 @@
 import os
 import uuid
+import hashlib
+import zipfile
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from werkzeug.utils import secure_filename
 from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from imaging import ORIGINALS_PREFIX, normalize_image, normalized_key_for_original, original_filename
+from previews import THUMBNAIL_PREFIX, queue_document_preview
+from spooling import HashedSpool
+from storage import get_storage
+
+
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor', 'prev_cursor'])
 
 
 def save_uploaded_file(file, folder_type):
@@ -12,80 +26,430 @@ def save_uploaded_file(file, folder_type):
         name, ext = os.path.splitext(filename)
         unique_filename = f"{folder_type}_{uuid.uuid4().hex[:8]}_{name}{ext}"
         
-        # Create upload directory if it doesn't exist
-        upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], folder_type)
-        os.makedirs(upload_path, exist_ok=True)
-        
-        # Save file
-        file_path = os.path.join(upload_path, unique_filename)
-        file.save(file_path)
+        # Save file, re-encoded when it is a photo or scan
+        key = sharded_key(folder_type, unique_filename)
+        normalized = normalize_image(file)
+        place_upload(normalized or file, key)
+        if normalized and current_app.config['KEEP_ORIGINAL_IMAGES']:
+            place_upload(file, original_filename(key))
         
-        return f"{folder_type}/{unique_filename}"
+        return key
     
     return None
 
 
-def save_crew_document(file, crew_id, document_type, document_category):
-    """Save crew document and create database record"""
-    from models import CrewDocument, db  # Import here to avoid circular imports
+def sharded_key(folder, filename):
+    """Storage key for filename under folder, fanned out by two levels of hex prefix"""
+    shard = hashlib.sha256(filename.encode('utf-8')).hexdigest()
+    return f"{folder}/{shard[:2]}/{shard[2:4]}/{filename}"
+
+
+def spooled_upload(file):
+    """The HashedSpool behind an upload parsed by SpooledUploadRequest, or None"""
+    stream = file.stream
+    return stream if isinstance(stream, HashedSpool) else None
+
+
+def place_upload(file, key, exclusive=False):
+    """Store an upload under key, linking its spooled temp file into place when there is one
     
-    if not file or not file.filename:
+    Returns whether the key was created; with exclusive an existing file is left as it is.
+    """
+    storage = get_storage()
+    spool = spooled_upload(file)
+    if spool and spool.path:
+        spool.flush()
+        return storage.save_file(key, spool.path, keep_source=True, exclusive=exclusive)
+    
+    if hasattr(file.stream, 'seek'):
+        file.stream.seek(0)
+    return storage.save_stream(key, file.stream, exclusive=exclusive)
+
+
+def stream_digest(file, chunk_size=64 * 1024):
+    """SHA-256 hex of an upload's bytes, reusing the digest taken while the request was parsed"""
+    spool = spooled_upload(file)
+    if spool:
+        return spool.sha256
+    
+    digest = hashlib.sha256()
+    file.stream.seek(0)
+    for chunk in iter(lambda: file.stream.read(chunk_size), b''):
+        digest.update(chunk)
+    file.stream.seek(0)
+    return digest.hexdigest()
+
+
+def copy_and_hash(file, target_path, chunk_size=64 * 1024):
+    """Copy an uploaded file to target_path, hashing it on the way; returns (size, sha256 hex)"""
+    digest = hashlib.sha256()
+    size = 0
+    stream = file.stream
+    if hasattr(stream, 'seek'):
+        stream.seek(0)
+    
+    with open(target_path, 'wb') as target:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            target.write(chunk)
+            size += len(chunk)
+    
+    return size, digest.hexdigest()
+
+
+BLOB_PREFIX = 'crew_documents/blobs/'
+
+
+def blob_filename(digest, ext):
+    """Content-addressed path for a blob, fanned out by the first two digest bytes"""
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+def content_digest(filename):
+    """SHA-256 embedded in a content-addressed key (blobs and previews), or None for other files"""
+    if not filename.startswith((BLOB_PREFIX, THUMBNAIL_PREFIX)):
         return None
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+StagedUpload = namedtuple('StagedUpload', ['file', 'original', 'original_digest', 'size', 'digest', 'temp_path'])
+
+
+def stage_upload(file, normalize=True):
+    """Normalize and hash an upload ahead of storing it; returns a StagedUpload"""
+    normalized = normalize_image(file) if normalize else None
+    stored = normalized or file
+    original, original_digest = (file, stream_digest(file)) if normalized else (None, None)
+    
+    spool = spooled_upload(stored)
+    if spool:
+        # Size and digest were recorded while the request was parsed; no second pass over the bytes
+        return StagedUpload(stored, original, original_digest, spool.size, spool.sha256, None)
+    
+    temp_folder = current_app.config['UPLOAD_TEMP_FOLDER']
+    os.makedirs(temp_folder, exist_ok=True)
+    temp_path = os.path.join(temp_folder, uuid.uuid4().hex)
+    size, digest = copy_and_hash(stored, temp_path)
+    return StagedUpload(stored, original, original_digest, size, digest, temp_path)
+
+
+def write_staged_upload(staged, key, exclusive=False):
+    """Put a staged upload's bytes into storage under key; returns whether the key was created"""
+    if staged.temp_path:
+        return get_storage().save_file(key, staged.temp_path, keep_source=True, exclusive=exclusive)
+    return place_upload(staged.file, key, exclusive=exclusive)
+
+
+def original_upload_key(staged, blob_key):
+    """Where a staged upload's untouched original is kept next to its normalized blob"""
+    return original_filename(blob_key, staged.original_digest, os.path.splitext(secure_filename(staged.original.filename))[1])
+
+
+def discard_staged_upload(staged):
+    """Remove the temp copy made while staging, if any"""
+    if staged.temp_path and os.path.exists(staged.temp_path):
+        os.remove(staged.temp_path)
+
+
+def store_document_blob(file):
+    """Store an upload under its SHA-256, reusing an existing copy; returns (filename, size, digest)"""
+    from models import StoredBlob, db  # Import here to avoid circular imports
+    
+    staged = stage_upload(file, normalize=False)
+    try:
+        blob = db.session.get(StoredBlob, staged.digest)
+        if blob:
+            blob.ref_count = StoredBlob.ref_count + 1
+            if not get_storage().exists(blob.filename):
+                # Row outlived its file; put the bytes back unless a concurrent upload just did
+                write_staged_upload(staged, blob.filename, exclusive=True)
+            return blob.filename, staged.size, staged.digest
         
-    # Generate unique filename
-    filename = secure_filename(file.filename)
-    name, ext = os.path.splitext(filename)
-    unique_filename = f"crew_{uuid.uuid4().hex[:8]}_{name}{ext}"
-    
-    # Create upload directory if it doesn't exist
-    upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'crew_documents')
-    os.makedirs(upload_path, exist_ok=True)
-    
-    # Save file
-    file_path = os.path.join(upload_path, unique_filename)
-    file.save(file_path)
-    
-    # Get file size
-    file_size = os.path.getsize(file_path)
-    
-    # Create database record
-    doc_record = CrewDocument(
-        crew_id=crew_id,
-        document_type=document_type,
-        document_category=document_category,
-        filename=f"crew_documents/{unique_filename}",
-        original_filename=file.filename,
-        file_size=file_size,
-        mime_type=file.content_type or 'application/octet-stream'
-    )
+        # Exclusive, so a concurrent first upload of the same bytes keeps the file it wrote
+        filename = blob_filename(staged.digest, os.path.splitext(secure_filename(file.filename))[1])
+        write_staged_upload(staged, filename, exclusive=True)
+        db.session.add(StoredBlob(sha256=staged.digest, filename=filename, file_size=staged.size, ref_count=1))
+        return filename, staged.size, staged.digest
+    finally:
+        discard_staged_upload(staged)
+
+
+def _map_in_app_context(func, items):
+    """Run func over items on a bounded thread pool, each call inside the current app's context"""
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    
+    app = current_app._get_current_object()
+    
+    def run(item):
+        with app.app_context():
+            return func(item)
+    
+    with ThreadPoolExecutor(max_workers=min(app.config['UPLOAD_WORKERS'], len(items))) as pool:
+        return list(pool.map(run, items))
+
+
+def claim_blob(digest, filename, file_size, references):
+    """Insert a blob row with references, or add them to the row a concurrent upload just inserted"""
+    from models import StoredBlob, db  # Import here to avoid circular imports
+    
+    try:
+        # A savepoint, so losing the race only undoes this insert and not the whole batch
+        with db.session.begin_nested():
+            blob = StoredBlob(sha256=digest, filename=filename, file_size=file_size, ref_count=references)
+            db.session.add(blob)
+        return blob
+    except IntegrityError:
+        blob = db.session.get(StoredBlob, digest, populate_existing=True)
+        blob.ref_count = StoredBlob.ref_count + references
+        return blob
+
+
+def save_crew_documents(uploads, crew_id):
+    """Save (file, document_type, document_category) uploads for a crew member in one transaction
+    
+    Files are staged and written concurrently; if anything fails, the temp copies and the
+    files this batch wrote are removed before the error propagates.
+    """
+    from models import CrewDocument, CrewMember, StoredBlob, db  # Import here to avoid circular imports
+    
+    uploads = [upload for upload in uploads if upload[0] and upload[0].filename]
+    if not uploads:
+        return []
+    
+    storage = get_storage()
+    staged_temps = []
+    written_keys = []
+    
+    def stage(file):
+        staged = stage_upload(file)
+        # Recorded as soon as it exists, so a sibling that fails to stage cannot leak it
+        staged_temps.append(staged)
+        return staged
+    
+    try:
+        staged_uploads = _map_in_app_context(stage, [file for file, _, _ in uploads])
+        
+        # One lookup for every digest in the batch; identical files share one blob
+        digests = Counter(staged.digest for staged in staged_uploads)
+        blobs = {blob.sha256: blob for blob in StoredBlob.query.filter(StoredBlob.sha256.in_(list(digests)))}
+        
+        pending_writes = {}
+        for staged, (file, _, _) in zip(staged_uploads, uploads):
+            blob = blobs.get(staged.digest)
+            if blob is None:
+                filename = blob_filename(staged.digest, os.path.splitext(secure_filename(file.filename))[1])
+                blob = blobs[staged.digest] = claim_blob(staged.digest, filename, staged.size, digests[staged.digest])
+                # Written exclusively below, so a concurrent upload that got there first keeps its file
+                pending_writes[blob.filename] = staged
+            elif staged.digest in digests:
+                blob.ref_count = StoredBlob.ref_count + digests[staged.digest]
+                if not storage.exists(blob.filename):
+                    # Row outlived its file; put the bytes back
+                    pending_writes[blob.filename] = staged
+            digests.pop(staged.digest, None)
+            
+            if staged.original and current_app.config['KEEP_ORIGINAL_IMAGES']:
+                pending_writes[original_upload_key(staged, blob.filename)] = staged._replace(file=staged.original, temp_path=None)
+        
+        def write(item):
+            key, staged = item
+            # Only files this request created are ours to remove if the commit fails; a key that
+            # already existed belongs to a concurrent upload of the same content
+            if write_staged_upload(staged, key, exclusive=True):
+                written_keys.append(key)
+        
+        _map_in_app_context(write, list(pending_writes.items()))
+        
+        documents = []
+        crew_member = db.session.get(CrewMember, crew_id)
+        for staged, (file, document_type, document_category) in zip(staged_uploads, uploads):
+            documents.append(CrewDocument(
+                crew_id=crew_id,
+                document_type=document_type,
+                document_category=document_category,
+                filename=blobs[staged.digest].filename,
+                original_filename=file.filename,
+                file_size=staged.size,
+                mime_type=file.content_type or 'application/octet-stream',
+                sha256=staged.digest
+            ))
+            # Keep the stored completion state in the same transaction as the new records
+            if crew_member:
+                crew_member.mark_document_uploaded(document_type)
+        
+        db.session.add_all(documents)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Drop the files this batch created, unless a concurrent upload has since committed a blob row for them
+        blob_keys = [normalized_key_for_original(key) if key.startswith(ORIGINALS_PREFIX) else key for key in written_keys]
+        referenced = {filename for filename, in db.session.query(StoredBlob.filename).filter(StoredBlob.filename.in_(blob_keys))}
+        for key, blob_key in zip(written_keys, blob_keys):
+            if blob_key not in referenced:
+                storage.delete(key)
+        raise
+    finally:
+        for staged in staged_temps:
+            discard_staged_upload(staged)
     
-    db.session.add(doc_record)
-    db.session.commit()
+    # Thumbnails are rendered off the request path
+    for document in documents:
+        queue_document_preview(document.id)
     
-    return doc_record
+    return documents
+
+
+def save_crew_document(file, crew_id, document_type, document_category):
+    """Save crew document and create database record"""
+    if not file or not file.filename:
+        return None
+    
+    return save_crew_documents([(file, document_type, document_category)], crew_id)[0]
 
 
 def save_multiple_crew_documents(files, crew_id, document_type, document_category):
     """Save multiple files for a document type and return list of saved records"""
-    saved_docs = []
-    
     if not files:
-        return saved_docs
+        return []
         
     # Handle single file or list of files
     if not isinstance(files, list):
         files = [files]
     
-    for file in files:
-        if file and file.filename:
-            doc_record = save_crew_document(file, crew_id, document_type, document_category)
-            if doc_record:
-                saved_docs.append(doc_record)
-    
-    return saved_docs
+    return save_crew_documents([(file, document_type, document_category) for file in files], crew_id)
 
 
 def allowed_file(filename, allowed_extensions):
     """Check if file extension is allowed"""
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in allowed_extensions
\ No newline at end of file
+           filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+
+def encode_cursor(record):
+    """Encode a record's (created_at, id) position as a URL-safe cursor"""
+    return f"{record.created_at.isoformat()}_{record.id}"
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into (created_at, id), or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    created_at, _, record_id = cursor.rpartition('_')
+    try:
+        return datetime.fromisoformat(created_at), int(record_id)
+    except ValueError:
+        return None
+
+
+def keyset_paginate(query, model, after=None, before=None, page_size=50):
+    """Return one page of query, newest first, seeking on (created_at, id) instead of OFFSET"""
+    from models import db  # Import here to avoid circular imports
+    
+    after = decode_cursor(after)
+    before = decode_cursor(before)
+    
+    if before:
+        # Walk towards newer rows, then flip back to newest-first for display
+        created_at, record_id = before
+        query = query.filter(db.or_(
+            model.created_at > created_at,
+            db.and_(model.created_at == created_at, model.id > record_id)
+        )).order_by(model.created_at.asc(), model.id.asc())
+        rows = query.limit(page_size + 1).all()
+        has_newer = len(rows) > page_size
+        items = rows[:page_size][::-1]
+        has_older = True
+    else:
+        if after:
+            created_at, record_id = after
+            query = query.filter(db.or_(
+                model.created_at < created_at,
+                db.and_(model.created_at == created_at, model.id < record_id)
+            ))
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+        rows = query.limit(page_size + 1).all()
+        has_older = len(rows) > page_size
+        items = rows[:page_size]
+        has_newer = after is not None
+    
+    return KeysetPage(
+        items=items,
+        next_cursor=encode_cursor(items[-1]) if items and has_older else None,
+        prev_cursor=encode_cursor(items[0]) if items and has_newer else None
+    )
+
+
+class _ZipStreamBuffer:
+    """Write-only sink for zipfile that hands back whatever was written since the last drain"""
+    
+    # No seek() on purpose: zipfile then writes data descriptors instead of rewinding headers
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._offset
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_crew_archive_entries(crew_member):
+    """Yield (archive name, storage key) for every stored document of a crew member"""
+    from models import LEGACY_FILE_COLUMNS, document_category_for_type  # Import here to avoid circular imports
+    
+    archived_keys = set()
+    for document in crew_member.get_all_documents():
+        original_name = secure_filename(document.original_filename) or os.path.basename(document.filename)
+        archived_keys.add(document.filename)
+        yield (f"{document.document_category}/{document.document_type}/{document.id}_{original_name}",
+               document.filename)
+    
+    # Registration files that backfill-legacy-documents has not converted yet
+    for column in LEGACY_FILE_COLUMNS:
+        key = getattr(crew_member, column)
+        if key and key not in archived_keys:
+            document_type = column[:-len('_file')]
+            yield (f"{document_category_for_type(document_type)}/{document_type}/registration_{os.path.basename(key)}",
+                   key)
+
+
+def iter_crew_documents_zip(crew_member, chunk_size=64 * 1024):
+    """Stream a ZIP of a crew member's documents, organized by category, without buffering it"""
+    buffer = _ZipStreamBuffer()
+    storage = get_storage()
+    
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for arcname, key in iter_crew_archive_entries(crew_member):
+            if not storage.exists(key):
+                current_app.logger.warning(f'Skipping missing file {key} for crew {crew_member.id}')
+                continue
+            
+            with storage.open(key) as source, archive.open(arcname, 'w', force_zip64=True) as target:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            
+            yield buffer.drain()
+    
+    # Central directory is written when the archive closes
+    yield buffer.drain()